@@ -1,5 +1,6 @@
 """撸了吗 - 打卡系统主程序"""
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
@@ -14,6 +15,7 @@ load_dotenv()
 
 from src.api.routes import router as api_router
 from src.api.admin import router as admin_router
+from src.db.schema import init_db
 from src.utils.security import is_blocked_country
 
 
@@ -95,8 +97,15 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         return response
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时初始化数据库（建表 + 迁移）"""
+    init_db()
+    yield
+
+
 # 创建 FastAPI 应用
-app = FastAPI(title="撸了吗", description="一个支持多媒体的打卡系统", version="0.1.0")
+app = FastAPI(title="撸了吗", description="一个支持多媒体的打卡系统", version="0.1.0", lifespan=lifespan)
 
 # 添加安全中间件
 app.add_middleware(SecurityMiddleware)
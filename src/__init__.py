@@ -0,0 +1 @@
+"""撸了吗 - 源码包"""
@@ -0,0 +1 @@
+"""API 路由模块"""
@@ -4,12 +4,9 @@ from functools import wraps
 from typing import Optional
 from fastapi import APIRouter, Request, HTTPException, Header, Depends
 from fastapi.responses import JSONResponse
-
-import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
 
-from db.repositories import checkin as checkin_repo
+from ..db.repositories import checkin as checkin_repo
 
 
 router = APIRouter(prefix="/api/admin")
@@ -53,10 +50,12 @@ async def get_stats(authorized: bool = Depends(require_admin_key)):
 async def get_pending_list(
     page: int = 1,
     limit: int = 20,
+    cursor_ts: Optional[int] = None,
+    cursor_id: Optional[int] = None,
     authorized: bool = Depends(require_admin_key)
 ):
-    """获取待审核列表"""
-    checkins, total = checkin_repo.get_pending_list(page, limit)
+    """获取待审核列表（传入上一页的 next_cursor 时按游标翻页）"""
+    checkins, total, next_cursor = checkin_repo.get_pending_list(page, limit, cursor_ts, cursor_id)
     
     return {
         "success": True,
@@ -65,7 +64,8 @@ async def get_pending_list(
             "total": total,
             "page": page,
             "limit": limit,
-            "total_pages": (total + limit - 1) // limit if total > 0 else 0
+            "total_pages": (total + limit - 1) // limit if total > 0 else 0,
+            "next_cursor": next_cursor
         }
     }
 
@@ -156,10 +156,8 @@ async def batch_approve(
     if not ids:
         raise HTTPException(status_code=400, detail="请提供要操作的 ID 列表")
     
-    success_count = 0
-    for checkin_id in ids:
-        if checkin_repo.approve(checkin_id):
-            success_count += 1
+    # 单个事务内批量执行
+    success_count = checkin_repo.approve_many(ids)
     
     return {
         "success": True,
@@ -179,10 +177,8 @@ async def batch_reject(
     if not ids:
         raise HTTPException(status_code=400, detail="请提供要操作的 ID 列表")
     
-    success_count = 0
-    for checkin_id in ids:
-        if checkin_repo.reject(checkin_id):
-            success_count += 1
+    # 单个事务内批量执行
+    success_count = checkin_repo.reject_many(ids)
     
     return {
         "success": True,
@@ -199,7 +195,7 @@ async def get_all_checkins(
 ):
     """获取所有记录（管理员视角）"""
     if status == "pending":
-        checkins, total = checkin_repo.get_pending_list(page, limit)
+        checkins, total, _ = checkin_repo.get_pending_list(page, limit)
     elif status == "approved":
         checkins, total = checkin_repo.get_list(page, limit, approved_only=True)
     else:
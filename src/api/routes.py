@@ -1,34 +1,27 @@
 """API 路由"""
-import json
-import uuid
+import secrets
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 import aiofiles
+import orjson
 from fastapi import APIRouter, UploadFile, File, Form, Request, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 
-import sys
-sys.path.append(str(Path(__file__).parent.parent))
-
-from db.database import create_checkin, get_checkins, add_like, get_liked_checkins, get_checkin_by_id
-from utils.validators import (
-    validate_email,
-    validate_url,
-    validate_qq,
-    validate_nickname,
-    validate_emoji,
-    validate_content,
+from ..db.database import create_checkin, get_checkins_async, add_like, get_liked_checkins, get_checkin_by_id
+from ..db.models import checkins_to_json
+from ..utils.validators import (
     validate_all_fields,
     sanitize_html,
     auto_review_content
 )
-from utils.security import (
+from ..utils.security import (
     security_check,
     is_blocked_country,
     add_to_blacklist
 )
-from utils.archive_handler import (
+from ..utils.archive_handler import (
     is_archive_file,
     validate_archive,
     extract_preview_images,
@@ -38,8 +31,11 @@ from utils.archive_handler import (
 
 router = APIRouter(prefix="/api")
 
+# src 目录（静态文件与上传文件的根路径）
+SRC_ROOT = Path(__file__).resolve().parent.parent
+
 # 文件上传配置
-UPLOAD_DIR = Path(__file__).parent.parent / "static" / "uploads"
+UPLOAD_DIR = SRC_ROOT / "static" / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 ALLOWED_EXTENSIONS = {
@@ -48,6 +44,20 @@ ALLOWED_EXTENSIONS = {
     "archive": [".zip", ".7z"]
 }
 
+# 固定内容的错误响应（模块加载时构建一次，请求时直接复用同一实例）
+_ERR_ARCHIVE_FMT = JSONResponse(
+    status_code=400,
+    content={"success": False, "message": "只支持 ZIP 和 7Z 格式"}
+)
+_ERR_FILE_FMT = JSONResponse(
+    status_code=400,
+    content={"success": False, "message": "不支持的文件格式"}
+)
+_ERR_FILE_SIZE = JSONResponse(
+    status_code=400,
+    content={"success": False, "message": f"文件大小超过{MAX_FILE_SIZE / 1024 / 1024:.0f}MB限制"}
+)
+
 
 def get_file_type(filename: str) -> str:
     """获取文件类型"""
@@ -74,16 +84,12 @@ async def get_archive_full_image(file: UploadFile = File(...), path: str = Form(
     # 验证文件类型
     ext = Path(file.filename).suffix.lower()
     if ext not in ALLOWED_EXTENSIONS["archive"]:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": "只支持 ZIP 和 7Z 格式"}
-        )
+        return _ERR_ARCHIVE_FMT
     
     # 读取文件内容
     content = await file.read()
     
     # 保存到临时文件
-    import tempfile
     with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
         tmp.write(content)
         tmp_path = Path(tmp.name)
@@ -128,7 +134,7 @@ async def get_saved_archive_full_image(
     
     # 构建绝对路径
     relative_path = archive_url.replace('/static/', '')
-    archive_path = Path(__file__).parent.parent / "static" / relative_path.lstrip('/')
+    archive_path = SRC_ROOT / "static" / relative_path.lstrip('/')
     
     # 验证文件存在
     if not archive_path.exists():
@@ -140,10 +146,7 @@ async def get_saved_archive_full_image(
     # 验证文件类型
     ext = archive_path.suffix.lower()
     if ext not in ALLOWED_EXTENSIONS["archive"]:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": "只支持 ZIP 和 7Z 格式"}
-        )
+        return _ERR_ARCHIVE_FMT
     
     try:
         handler = ArchiveHandler(archive_path)
@@ -169,10 +172,7 @@ async def preview_archive(file: UploadFile = File(...)):
     # 验证文件类型
     ext = Path(file.filename).suffix.lower()
     if ext not in ALLOWED_EXTENSIONS["archive"]:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": "只支持 ZIP 和 7Z 格式"}
-        )
+        return _ERR_ARCHIVE_FMT
     
     # 读取文件内容
     content = await file.read()
@@ -180,14 +180,9 @@ async def preview_archive(file: UploadFile = File(...)):
     
     # 验证文件大小
     if file_size > MAX_FILE_SIZE:
-        size_mb = MAX_FILE_SIZE / 1024 / 1024
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": f"文件大小超过{size_mb:.0f}MB限制"}
-        )
+        return _ERR_FILE_SIZE
     
     # 保存到临时文件
-    import tempfile
     with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
         tmp.write(content)
         tmp_path = Path(tmp.name)
@@ -203,11 +198,12 @@ async def preview_archive(file: UploadFile = File(...)):
         
         # 获取图片列表
         handler = ArchiveHandler(tmp_path)
-        image_list = handler.list_images()
-        metadata = handler.get_metadata()
-        
-        # 生成缩略图（最多100张）
-        images_with_thumbnails = handler.get_thumbnails(image_list, max_count=100)
+        with handler.open():
+            image_list = handler.list_images()
+            metadata = handler.get_metadata()
+            
+            # 生成缩略图（最多100张）
+            images_with_thumbnails = handler.get_thumbnails(image_list, max_count=100)
         
         return {
             "success": True,
@@ -234,10 +230,7 @@ async def upload_file(file: UploadFile = File(...)):
     """上传单个文件（支持图片、视频、压缩包）"""
     # 验证文件类型
     if not is_allowed_file(file.filename):
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": "不支持的文件格式"}
-        )
+        return _ERR_FILE_FMT
     
     # 读取文件内容
     content = await file.read()
@@ -245,19 +238,16 @@ async def upload_file(file: UploadFile = File(...)):
     
     # 验证文件大小
     if file_size > MAX_FILE_SIZE:
-        size_mb = MAX_FILE_SIZE / 1024 / 1024
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": f"文件大小超过{size_mb:.0f}MB限制"}
-        )
+        return _ERR_FILE_SIZE
     
-    # 生成唯一文件名
+    # 生成唯一文件名（96 位随机数，URL 安全）
     ext = Path(file.filename).suffix.lower()
-    unique_filename = f"{uuid.uuid4()}{ext}"
+    unique_filename = f"{secrets.token_urlsafe(12)}{ext}"
     
     # 按年月组织目录
     now = datetime.now()
-    date_dir = UPLOAD_DIR / f"{now.year}-{now.month:02d}"
+    month_dir = f"{now.year}-{now.month:02d}"
+    date_dir = UPLOAD_DIR / month_dir
     
     file_type = get_file_type(file.filename)
     
@@ -274,9 +264,9 @@ async def upload_file(file: UploadFile = File(...)):
     
     # 返回相对路径
     if file_type == "archive":
-        relative_path = f"/static/uploads/{now.year}-{now.month:02d}/archives/{unique_filename}"
+        relative_path = f"/static/uploads/{month_dir}/archives/{unique_filename}"
     else:
-        relative_path = f"/static/uploads/{now.year}-{now.month:02d}/{unique_filename}"
+        relative_path = f"/static/uploads/{month_dir}/{unique_filename}"
     
     result = {
         "success": True,
@@ -345,13 +335,14 @@ async def create_checkin_record(
             content={"success": False, "message": error_msg}
         )
     
-    # === 综合字段安全验证 ===
+    # === 综合字段验证（安全检测 + 格式校验） ===
     is_valid, error_msg = validate_all_fields(
         content=content,
         nickname=nickname,
         email=email,
         qq=qq,
-        url=url
+        url=url,
+        avatar=avatar
     )
     if not is_valid:
         return JSONResponse(
@@ -359,54 +350,6 @@ async def create_checkin_record(
             content={"success": False, "message": error_msg}
         )
     
-    # 验证内容
-    is_valid, error_msg = validate_content(content)
-    if not is_valid:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error_msg}
-        )
-    
-    # 验证昵称
-    is_valid, error_msg = validate_nickname(nickname)
-    if not is_valid:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error_msg}
-        )
-    
-    # 验证邮箱
-    is_valid, error_msg = validate_email(email)
-    if not is_valid:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error_msg}
-        )
-    
-    # 验证 QQ 号
-    is_valid, error_msg = validate_qq(qq)
-    if not is_valid:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error_msg}
-        )
-    
-    # 验证 URL
-    is_valid, error_msg = validate_url(url)
-    if not is_valid:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error_msg}
-        )
-    
-    # 验证头像 emoji
-    is_valid, error_msg = validate_emoji(avatar)
-    if not is_valid:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error_msg}
-        )
-    
     # 处理上传的文件
     media_files = []
     archive_file_path = None
@@ -433,7 +376,7 @@ async def create_checkin_record(
                     archive_file_count = 1
                     # 从 URL 构建文件路径
                     archive_url = upload_result["url"]
-                    archive_file_path = Path(__file__).parent.parent / archive_url.lstrip("/")
+                    archive_file_path = SRC_ROOT / archive_url.lstrip("/")
     
     # 如果是压缩包，处理预览图
     if file_type_flag == "archive" and archive_file_path and archive_file_path.exists():
@@ -445,7 +388,7 @@ async def create_checkin_record(
         selected_images = None
         if archive_preview_images:
             try:
-                selected_images = json.loads(archive_preview_images)
+                selected_images = orjson.loads(archive_preview_images)
             except:
                 pass
         
@@ -501,27 +444,34 @@ async def create_checkin_record(
         url=url,
         avatar=avatar,
         file_type=file_type_flag,
-        archive_metadata=json.dumps(archive_metadata_dict) if archive_metadata_dict else None,
+        archive_metadata=orjson.dumps(archive_metadata_dict).decode() if archive_metadata_dict else None,
         approved=auto_approved,
         review_reason=review_reason if not auto_approved else None
     )
     
     # 根据审核结果返回不同的消息
+    # 直接用 orjson 序列化为响应，跳过 FastAPI 的 jsonable_encoder 遍历
     if auto_approved:
-        return {
-            "success": True,
-            "message": "打卡成功",
-            "id": checkin_id,
-            "media_count": archive_file_count if file_type_flag == "archive" else len(media_files)
-        }
+        return Response(
+            content=orjson.dumps({
+                "success": True,
+                "message": "打卡成功",
+                "id": checkin_id,
+                "media_count": archive_file_count if file_type_flag == "archive" else len(media_files)
+            }),
+            media_type="application/json"
+        )
     else:
-        return {
-            "success": True,
-            "message": "提交成功，内容需要审核后才会显示",
-            "id": checkin_id,
-            "media_count": archive_file_count if file_type_flag == "archive" else len(media_files),
-            "pending_review": True
-        }
+        return Response(
+            content=orjson.dumps({
+                "success": True,
+                "message": "提交成功，内容需要审核后才会显示",
+                "id": checkin_id,
+                "media_count": archive_file_count if file_type_flag == "archive" else len(media_files),
+                "pending_review": True
+            }),
+            media_type="application/json"
+        )
 
 
 @router.get("/checkins")
@@ -532,10 +482,14 @@ async def get_checkin_list(
     sort: str = Query(default="desc", pattern="^(asc|desc)$"),
     sort_by: str = Query(default="id", pattern="^(id|love)$"),
     nickname: Optional[str] = Query(default=None),
+    nickname_prefix: Optional[str] = Query(default=None),
     email: Optional[str] = Query(default=None),
     content: Optional[str] = Query(default=None),
     exclude_default_nickname: bool = Query(default=False),
-    min_content_length: Optional[int] = Query(default=None, ge=0)
+    min_content_length: Optional[int] = Query(default=None, ge=0),
+    cursor_id: Optional[int] = Query(default=None),
+    cursor_love: Optional[int] = Query(default=None),
+    include_total: bool = Query(default=True)
 ):
     """获取打卡记录列表（支持搜索和筛选）
     
@@ -545,10 +499,14 @@ async def get_checkin_list(
         sort: 排序方式 (asc=正序, desc=倒序)
         sort_by: 排序字段 (id=按ID, love=按点赞数)
         nickname: 昵称（模糊搜索）
+        nickname_prefix: 昵称前缀（前缀匹配，比模糊搜索快）
         email: 邮箱（精确搜索）
         content: 内容关键词（模糊搜索）
         exclude_default_nickname: 排除默认昵称用户
         min_content_length: 最小内容长度
+        cursor_id: 游标分页 - 上一页返回的 next_cursor.cursor_id（传入时忽略 page）
+        cursor_love: 游标分页 - 上一页返回的 next_cursor.cursor_love（sort_by=love 时需要）
+        include_total: 是否返回总数（无限滚动可传 false 跳过统计）
     """
     # 获取客户端 IP
     client_ip = request.client.host if request.client else None
@@ -565,7 +523,7 @@ async def get_checkin_list(
             content={"success": False, "message": error_msg}
         )
     
-    checkins, total = get_checkins(
+    checkins, total = await get_checkins_async(
         page=page,
         limit=limit,
         sort_order=sort,
@@ -574,31 +532,41 @@ async def get_checkin_list(
         email=email,
         content_keyword=content,
         exclude_default_nickname=exclude_default_nickname,
-        min_content_length=min_content_length
+        min_content_length=min_content_length,
+        cursor_id=cursor_id,
+        cursor_love=cursor_love,
+        include_total=include_total,
+        nickname_prefix=nickname_prefix
     )
     
-    # 获取当前用户已点赞的记录
+    # 下一页游标（本页已满时返回，客户端据此继续翻页）
+    next_cursor = None
+    if len(checkins) == limit:
+        last = checkins[-1]
+        next_cursor = {
+            "cursor_id": last.id,
+            "cursor_love": last.love if sort_by == "love" else None
+        }
+    
+    # 获取当前用户在本页中已点赞的记录
     client_ip = request.client.host if request.client else None
-    liked_ids = get_liked_checkins(client_ip) if client_ip else []
-    
-    # 转换为字典列表
-    checkin_list = []
-    for checkin in checkins:
-        checkin_dict = checkin.to_dict()
-        # 解析 media_files JSON 字符串
-        checkin_dict["media_files"] = json.loads(checkin_dict["media_files"])
-        # 添加是否已点赞标记
-        checkin_dict["liked"] = checkin.id in liked_ids
-        checkin_list.append(checkin_dict)
-    
-    return {
-        "success": True,
-        "data": checkin_list,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": (total + limit - 1) // limit
-    }
+    if client_ip and checkins:
+        liked_ids = get_liked_checkins(client_ip, [checkin.id for checkin in checkins])
+    else:
+        liked_ids = frozenset()
+    
+    # 直接序列化为 JSON 字节（附带是否已点赞标记，不构造中间字典）
+    content = checkins_to_json(
+        checkins,
+        liked_ids=liked_ids,
+        success=True,
+        total=total,
+        page=page,
+        limit=limit,
+        pages=(total + limit - 1) // limit if total is not None else None,
+        next_cursor=next_cursor
+    )
+    return Response(content=content, media_type="application/json")
 
 
 @router.post("/like/{checkin_id}")
@@ -618,12 +586,15 @@ async def like_checkin(checkin_id: int, request: Request):
     
     success, love_count, message = add_like(checkin_id, client_ip)
     
-    return {
-        "success": success,
-        "message": message,
-        "love": love_count,
-        "liked": True if success else None  # 成功时标记为已点赞
-    }
+    return Response(
+        content=orjson.dumps({
+            "success": success,
+            "message": message,
+            "love": love_count,
+            "liked": True if success else None  # 成功时标记为已点赞
+        }),
+        media_type="application/json"
+    )
 
 
 @router.get("/download/{checkin_id}")
@@ -643,15 +614,9 @@ async def download_archive(checkin_id: int):
     if checkin.file_type != "archive":
         raise HTTPException(status_code=400, detail="该记录不包含压缩包")
     
-    # 解析 media_files 找到压缩包文件
-    try:
-        media_files = json.loads(checkin.media_files)
-    except:
-        raise HTTPException(status_code=500, detail="数据格式错误")
-    
     # 找到压缩包文件
     archive_url = None
-    for url in media_files:
+    for url in checkin.media_files:
         if '/archives/' in url and (url.endswith('.zip') or url.endswith('.7z')):
             archive_url = url
             break
@@ -660,7 +625,7 @@ async def download_archive(checkin_id: int):
         raise HTTPException(status_code=404, detail="未找到压缩包文件")
     
     # 构建文件路径
-    file_path = Path(__file__).parent.parent / archive_url.lstrip("/")
+    file_path = SRC_ROOT / archive_url.lstrip("/")
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="文件不存在")
@@ -669,7 +634,7 @@ async def download_archive(checkin_id: int):
     original_filename = file_path.name
     if checkin.archive_metadata:
         try:
-            metadata = json.loads(checkin.archive_metadata)
+            metadata = orjson.loads(checkin.archive_metadata)
             original_filename = metadata.get("filename", file_path.name)
         except:
             pass
@@ -0,0 +1 @@
+"""数据库模块"""
@@ -1,46 +1,197 @@
 """数据库连接管理"""
+import os
+import queue
 import sqlite3
+import threading
 from pathlib import Path
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Optional
 
 # 数据库路径
 DB_PATH = Path(__file__).parent / "lol.db"
 
 # 当前数据库版本
-DB_VERSION = "5.0"
+DB_VERSION = "8.0"
 
+# 只读连接池大小
+READER_POOL_SIZE = 4
 
-def get_connection() -> sqlite3.Connection:
-    """获取数据库连接"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+# 每个连接缓存的预编译语句数量（sqlite3 默认 128）
+STATEMENT_CACHE_SIZE = 256
+
+# 每个连接建立时执行的 PRAGMA
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -64000",  # 页缓存约 64MB（负数单位为 KiB）
+    "PRAGMA mmap_size = 268435456",  # 256MB 内存映射
+)
+
+# 内容搜索是否使用全文索引（设置环境变量 FTS_SEARCH=0 可回退到 LIKE）
+FTS_SEARCH_ENABLED = os.getenv("FTS_SEARCH", "1") != "0"
+
+# 初始化状态（建表 + 迁移每个进程只执行一次）
+_INITIALIZED = False
+_INIT_LOCK = threading.Lock()
+_FTS_AVAILABLE = False
+
+
+def ensure_initialized() -> None:
+    """首次使用时初始化数据库
+    
+    建表与所有迁移在同一个连接上完成，最后统一提交一次。
+    已初始化时只做一次标志位检查。
+    """
+    global _INITIALIZED, _FTS_AVAILABLE
+    
+    if _INITIALIZED:
+        return
+    
+    with _INIT_LOCK:
+        if _INITIALIZED:
+            return
+        
+        # 延迟导入，避免与 schema / migrations 循环依赖
+        from .schema import create_tables
+        from .migrations import run_migrations
+        
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            cursor = conn.cursor()
+            create_tables(cursor)
+            run_migrations(cursor)
+            conn.commit()
+            
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'check_ins_fts'")
+            _FTS_AVAILABLE = cursor.fetchone() is not None
+        finally:
+            conn.close()
+        
+        _INITIALIZED = True
+
+
+def fts_available() -> bool:
+    """内容全文索引是否可用（已建表且未被 FTS_SEARCH 关闭）"""
+    ensure_initialized()
+    return FTS_SEARCH_ENABLED and _FTS_AVAILABLE
+
+
+class PooledConnection(sqlite3.Connection):
+    """连接池中的连接，附带一个长期复用的游标
+    
+    固定 SQL 的查询与写入（按 ID 查询、点赞、审核、统计）使用 hot_cursor()，避免每次创建和销毁游标对象；
+    预编译语句本身由连接的语句缓存复用。动态拼接的 SQL 仍使用普通的 cursor()。
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hot_cursor: Optional[sqlite3.Cursor] = None
+    
+    def hot_cursor(self) -> sqlite3.Cursor:
+        """返回该连接上复用的游标（调用方需在归还连接前取完结果）"""
+        if self._hot_cursor is None:
+            self._hot_cursor = self.cursor()
+        return self._hot_cursor
+
+
+def get_connection() -> PooledConnection:
+    """创建一个新的数据库连接（WAL 模式，可跨线程使用，由调用方管理事务）"""
+    conn = sqlite3.connect(
+        DB_PATH,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=PooledConnection
+    )
+    # 不设置 row_factory：行为普通元组，按位置取值比 sqlite3.Row 按列名查找更快
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+class ConnectionPool:
+    """SQLite 连接池：1 个写连接 + N 个只读连接
+    
+    WAL 模式下读写互不阻塞：写操作串行使用同一个写连接（加锁），
+    读操作从队列中取用只读连接，用完归还。连接在首次使用时才创建。
+    """
+    
+    def __init__(self, reader_count: int = READER_POOL_SIZE):
+        self._reader_count = reader_count
+        self._readers: queue.Queue = queue.Queue()
+        self._reader_created = 0
+        self._reader_lock = threading.Lock()
+        self._writer: Optional[PooledConnection] = None
+        self._writer_lock = threading.Lock()
+    
+    @contextmanager
+    def writer(self) -> Generator[PooledConnection, None, None]:
+        """获取写连接，在一个 IMMEDIATE 事务中执行，正常结束时提交"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = get_connection()
+            conn = self._writer
+            
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+    
+    @contextmanager
+    def reader(self) -> Generator[PooledConnection, None, None]:
+        """获取只读连接（自动提交模式），用完归还连接池"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+    
+    def _acquire_reader(self) -> PooledConnection:
+        """取出一个空闲只读连接，不足时按需创建"""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._reader_lock:
+            if self._reader_created < self._reader_count:
+                self._reader_created += 1
+                return get_connection()
+        
+        # 连接数已达上限，等待其他调用方归还
+        return self._readers.get()
+
+
+# 进程内共享的连接池
+_pool = ConnectionPool()
+
+
 @contextmanager
-def get_db() -> Generator[sqlite3.Connection, None, None]:
+def get_db(readonly: bool = False) -> Generator[PooledConnection, None, None]:
     """数据库连接上下文管理器
     
+    Args:
+        readonly: True 使用只读连接；False 使用写连接（事务内执行，结束时提交，异常时回滚）
+    
     用法:
-        with get_db() as conn:
+        with get_db(readonly=True) as conn:
             cursor = conn.cursor()
             ...
     """
-    conn = get_connection()
-    try:
+    ensure_initialized()
+    pool_context = _pool.reader() if readonly else _pool.writer()
+    with pool_context as conn:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def execute_query(sql: str, params: tuple = ()) -> list:
-    """执行查询并返回结果"""
-    with get_db() as conn:
+    """执行查询并返回结果（元组列表）"""
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute(sql, params)
         return cursor.fetchall()
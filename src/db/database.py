@@ -1,7 +1,7 @@
 """数据库操作 - 兼容层
 保持原有 API 不变，内部委托给新的模块化实现
 """
-from typing import List, Optional, Tuple
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 from .models import CheckIn
 from .schema import init_db
@@ -43,6 +43,11 @@ def create_checkin(
     )
 
 
+def create_checkins(records: List[Dict[str, Any]]) -> List[int]:
+    """批量创建打卡记录（单个事务）"""
+    return checkin_repo.create_many(records)
+
+
 def get_checkins(
     page: int = 1,
     limit: int = 20,
@@ -52,9 +57,13 @@ def get_checkins(
     email: Optional[str] = None,
     content_keyword: Optional[str] = None,
     exclude_default_nickname: bool = False,
-    min_content_length: Optional[int] = None
-) -> Tuple[List[CheckIn], int]:
-    """获取打卡记录列表"""
+    min_content_length: Optional[int] = None,
+    cursor_id: Optional[int] = None,
+    cursor_love: Optional[int] = None,
+    include_total: bool = True,
+    nickname_prefix: Optional[str] = None
+) -> Tuple[List[CheckIn], Optional[int]]:
+    """获取打卡记录列表（传入游标时使用 keyset 分页，include_total=False 时不统计总数）"""
     return checkin_repo.get_list(
         page=page,
         limit=limit,
@@ -64,10 +73,19 @@ def get_checkins(
         email=email,
         content_keyword=content_keyword,
         exclude_default_nickname=exclude_default_nickname,
-        min_content_length=min_content_length
+        min_content_length=min_content_length,
+        cursor_id=cursor_id,
+        cursor_love=cursor_love,
+        include_total=include_total,
+        nickname_prefix=nickname_prefix
     )
 
 
+async def get_checkins_async(include_total: bool = True, **filters) -> Tuple[List[CheckIn], Optional[int]]:
+    """获取打卡记录列表（异步，参数同 get_checkins，总数与数据并行查询）"""
+    return await checkin_repo.get_list_async(include_total=include_total, **filters)
+
+
 def get_checkin_by_id(checkin_id: int) -> Optional[CheckIn]:
     """根据ID获取打卡记录"""
     return checkin_repo.get_by_id(checkin_id)
@@ -83,10 +101,17 @@ def check_liked(checkin_id: int, ip_address: str) -> bool:
     return like_repo.check(checkin_id, ip_address)
 
 
-def get_liked_checkins(ip_address: str) -> List[int]:
-    """获取某IP已点赞的所有记录ID"""
-    return like_repo.get_liked_ids(ip_address)
+def check_liked_many(checkin_ids: Iterable[int], ip_address: str) -> FrozenSet[int]:
+    """批量检查是否已点赞，返回其中已点赞的记录ID
+    
+    使用该 IP 的已点赞缓存取交集；点赞数过多不缓存时按 checkin_ids 做一次 IN 查询。
+    """
+    return like_repo.get_liked_ids(ip_address, checkin_ids)
 
 
-# 应用启动时初始化数据库
-init_db()
+def get_liked_checkins(
+    ip_address: str,
+    checkin_ids: Optional[Iterable[int]] = None
+) -> FrozenSet[int]:
+    """获取某IP已点赞的记录ID（可限定在 checkin_ids 范围内）"""
+    return like_repo.get_liked_ids(ip_address, checkin_ids)
@@ -1,6 +1,8 @@
 """数据库迁移管理"""
 import sqlite3
-from .connection import DB_PATH
+
+# likes 表选项（STRICT 需要 SQLite 3.37+）
+LIKES_TABLE_OPTIONS = "WITHOUT ROWID, STRICT" if sqlite3.sqlite_version_info >= (3, 37, 0) else "WITHOUT ROWID"
 
 
 def _check_column_exists(cursor: sqlite3.Cursor, table_name: str, column_name: str) -> bool:
@@ -19,7 +21,7 @@ def _check_table_exists(cursor: sqlite3.Cursor, table_name: str) -> bool:
     return cursor.fetchone() is not None
 
 
-def migrate_v1_to_v2(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
+def migrate_v1_to_v2(cursor: sqlite3.Cursor):
     """V1.0 -> V2.0: 添加用户信息字段"""
     if _check_column_exists(cursor, "check_ins", "nickname"):
         return
@@ -32,11 +34,10 @@ def migrate_v1_to_v2(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
     cursor.execute("ALTER TABLE check_ins ADD COLUMN avatar TEXT DEFAULT '🥰'")
     cursor.execute("UPDATE check_ins SET nickname = '用户0721' WHERE nickname IS NULL")
     cursor.execute("UPDATE check_ins SET avatar = '🥰' WHERE avatar IS NULL")
-    conn.commit()
     print("数据库迁移完成：V1.0 -> V2.0")
 
 
-def migrate_v2_to_v3(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
+def migrate_v2_to_v3(cursor: sqlite3.Cursor):
     """V2.0 -> V3.0: 添加点赞功能"""
     if _check_column_exists(cursor, "check_ins", "love"):
         return
@@ -50,38 +51,31 @@ def migrate_v2_to_v3(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
     # 创建 likes 表
     _create_likes_table(cursor)
     
-    conn.commit()
     print("数据库迁移完成：V2.0 -> V3.0")
 
 
-def _create_likes_table(cursor: sqlite3.Cursor):
-    """创建 likes 表"""
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS likes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+def _create_likes_table(cursor: sqlite3.Cursor, table_name: str = "likes"):
+    """创建 likes 表（V7.0 结构：复合主键，WITHOUT ROWID）"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
             checkin_id INTEGER NOT NULL,
             ip_address TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(checkin_id, ip_address),
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            PRIMARY KEY (checkin_id, ip_address),
             FOREIGN KEY (checkin_id) REFERENCES check_ins(id) ON DELETE CASCADE
-        )
-    """)
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_likes_checkin_ip 
-        ON likes(checkin_id, ip_address)
+        ) {LIKES_TABLE_OPTIONS}
     """)
 
 
-def ensure_likes_table(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
+def ensure_likes_table(cursor: sqlite3.Cursor):
     """确保 likes 表存在"""
     if _check_table_exists(cursor, "likes"):
         return
     
     _create_likes_table(cursor)
-    conn.commit()
 
 
-def migrate_v3_to_v4(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
+def migrate_v3_to_v4(cursor: sqlite3.Cursor):
     """V3.0 -> V4.0: 添加压缩包支持"""
     if _check_column_exists(cursor, "check_ins", "file_type"):
         return
@@ -95,18 +89,16 @@ def migrate_v3_to_v4(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
     # 添加 archive_metadata 字段
     cursor.execute("ALTER TABLE check_ins ADD COLUMN archive_metadata TEXT DEFAULT NULL")
     
-    conn.commit()
     print("数据库迁移完成：V3.0 -> V4.0")
 
 
-def migrate_v4_to_v5(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
+def migrate_v4_to_v5(cursor: sqlite3.Cursor):
     """V4.0 -> V5.0: 添加内容审核功能"""
     if _check_column_exists(cursor, "check_ins", "approved"):
         # 检查是否需要添加 review_reason 字段
         if not _check_column_exists(cursor, "check_ins", "review_reason"):
             print("补充迁移：添加 review_reason 字段")
             cursor.execute("ALTER TABLE check_ins ADD COLUMN review_reason TEXT DEFAULT NULL")
-            conn.commit()
         return
     
     print("开始数据库迁移：V4.0 -> V5.0")
@@ -122,20 +114,250 @@ def migrate_v4_to_v5(cursor: sqlite3.Cursor, conn: sqlite3.Connection):
     # 添加 review_reason 字段（记录触发审核的原因）
     cursor.execute("ALTER TABLE check_ins ADD COLUMN review_reason TEXT DEFAULT NULL")
     
-    conn.commit()
     print("数据库迁移完成：V4.0 -> V5.0")
 
 
-def run_migrations():
-    """执行所有数据库迁移"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def migrate_v5_to_v6(cursor: sqlite3.Cursor):
+    """V5.0 -> V6.0: 添加整数时间戳字段 created_ts"""
+    if _check_column_exists(cursor, "check_ins", "created_ts"):
+        return
+    
+    print("开始数据库迁移：V5.0 -> V6.0")
+    
+    # 添加 created_ts 字段（Unix 时间戳，秒），排序和读取不再解析 ISO 字符串
+    cursor.execute("ALTER TABLE check_ins ADD COLUMN created_ts INTEGER DEFAULT NULL")
+    # created_at 存的是本地时间，换算为 UTC 时间戳
+    cursor.execute("""
+        UPDATE check_ins
+        SET created_ts = CAST(strftime('%s', created_at, 'utc') AS INTEGER)
+        WHERE created_ts IS NULL
+    """)
+    
+    print("数据库迁移完成：V5.0 -> V6.0")
+
+
+def migrate_v6_to_v7(cursor: sqlite3.Cursor):
+    """V6.0 -> V7.0: likes 表改为复合主键的 WITHOUT ROWID 表
+    
+    去掉自增 id 和额外的 UNIQUE 索引，每次点赞少写一棵 B 树。
+    """
+    if not _check_column_exists(cursor, "likes", "id"):
+        return
+    
+    print("开始数据库迁移：V6.0 -> V7.0")
+    
+    _create_likes_table(cursor, "likes_new")
+    # 旧表 created_at 为 CURRENT_TIMESTAMP（UTC 字符串），转换为时间戳
+    cursor.execute("""
+        INSERT OR IGNORE INTO likes_new (checkin_id, ip_address, created_at)
+        SELECT checkin_id, ip_address,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+        FROM likes
+    """)
+    cursor.execute("DROP TABLE likes")
+    cursor.execute("ALTER TABLE likes_new RENAME TO likes")
+    
+    print("数据库迁移完成：V6.0 -> V7.0")
+
+
+def migrate_v7_to_v8(cursor: sqlite3.Cursor):
+    """V7.0 -> V8.0: 新增统计表 check_in_stats
+    
+    按当前数据初始化计数，之后由触发器随增删改维护，get_stats 不再扫表计数。
+    """
+    print("开始数据库迁移：V7.0 -> V8.0")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS check_in_stats (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("DELETE FROM check_in_stats")
+    cursor.execute("""
+        INSERT INTO check_in_stats (key, value)
+        SELECT 'total', COUNT(*) FROM check_ins
+        UNION ALL
+        SELECT 'approved', COUNT(*) FROM check_ins WHERE approved = 1
+        UNION ALL
+        SELECT 'pending', COUNT(*) FROM check_ins WHERE approved = 0
+    """)
+    
+    print("数据库迁移完成：V7.0 -> V8.0")
+
+
+def ensure_triggers(cursor: sqlite3.Cursor):
+    """确保触发器存在"""
+    # 脚本等直接写 created_at 的插入补齐 created_ts
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_created_ts
+        AFTER INSERT ON check_ins
+        WHEN NEW.created_ts IS NULL
+        BEGIN
+            UPDATE check_ins
+            SET created_ts = CAST(strftime('%s', NEW.created_at, 'utc') AS INTEGER)
+            WHERE id = NEW.id;
+        END
+    """)
+    # 统计表计数：总数、已通过（approved = 1）、待审（approved = 0）
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_stats_ai
+        AFTER INSERT ON check_ins
+        BEGIN
+            UPDATE check_in_stats SET value = value + 1
+            WHERE key = 'total'
+               OR (key = 'approved' AND NEW.approved = 1)
+               OR (key = 'pending' AND NEW.approved = 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_stats_ad
+        AFTER DELETE ON check_ins
+        BEGIN
+            UPDATE check_in_stats SET value = value - 1
+            WHERE key = 'total'
+               OR (key = 'approved' AND OLD.approved = 1)
+               OR (key = 'pending' AND OLD.approved = 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_stats_au
+        AFTER UPDATE OF approved ON check_ins
+        WHEN OLD.approved IS NOT NEW.approved
+        BEGIN
+            UPDATE check_in_stats
+            SET value = value + CASE key
+                WHEN 'approved' THEN (NEW.approved IS 1) - (OLD.approved IS 1)
+                ELSE (NEW.approved IS 0) - (OLD.approved IS 0)
+            END
+            WHERE key IN ('approved', 'pending');
+        END
+    """)
+
+
+def ensure_fts(cursor: sqlite3.Cursor):
+    """确保内容/昵称全文索引（FTS5 trigram）存在
+    
+    trigram 分词按字符切分，对中文子串搜索同样有效（unicode61 按词切分，不适合中文）。
+    SQLite 未编译 FTS5 或版本不支持 trigram 时跳过，搜索回退到 LIKE。
+    """
+    # 旧版索引只包含 content，重建为 content + nickname
+    if _check_table_exists(cursor, "check_ins_fts") and not _check_column_exists(cursor, "check_ins_fts", "nickname"):
+        print("重建全文索引：添加 nickname 列")
+        for trigger in ("trg_checkins_fts_ai", "trg_checkins_fts_ad", "trg_checkins_fts_au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE check_ins_fts")
+    
+    if not _check_table_exists(cursor, "check_ins_fts"):
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE check_ins_fts USING fts5(
+                    content, nickname, content='check_ins', content_rowid='id', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"全文索引不可用，内容和昵称搜索将使用 LIKE: {e}")
+            return
+        
+        print("创建全文索引")
+        cursor.execute("INSERT INTO check_ins_fts(check_ins_fts) VALUES ('rebuild')")
+    
+    # 同步触发器（外部内容表需要手动维护索引）
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_fts_ai
+        AFTER INSERT ON check_ins
+        BEGIN
+            INSERT INTO check_ins_fts(rowid, content, nickname) VALUES (NEW.id, NEW.content, NEW.nickname);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_fts_ad
+        AFTER DELETE ON check_ins
+        BEGIN
+            INSERT INTO check_ins_fts(check_ins_fts, rowid, content, nickname) VALUES ('delete', OLD.id, OLD.content, OLD.nickname);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkins_fts_au
+        AFTER UPDATE OF content, nickname ON check_ins
+        BEGIN
+            INSERT INTO check_ins_fts(check_ins_fts, rowid, content, nickname) VALUES ('delete', OLD.id, OLD.content, OLD.nickname);
+            INSERT INTO check_ins_fts(rowid, content, nickname) VALUES (NEW.id, NEW.content, NEW.nickname);
+        END
+    """)
+
+
+def ensure_indexes(cursor: sqlite3.Cursor):
+    """确保查询所需的索引存在（在所有字段迁移之后执行）"""
+    # 旧索引已被下面带 approved 前缀的索引取代
+    cursor.execute("DROP INDEX IF EXISTS idx_checkins_love_id")
+    cursor.execute("DROP INDEX IF EXISTS idx_checkins_created_ts")
+    cursor.execute("DROP INDEX IF EXISTS idx_checkins_pending")
+    # 按点赞数排序的 keyset 分页（公开列表只看已通过的记录）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkins_approved_love
+        ON check_ins(approved, love DESC, id DESC)
+    """)
+    # 按 ID 排序的 keyset 分页（公开列表默认排序，正序 / 倒序与游标定位都在索引内完成）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkins_approved_id
+        ON check_ins(approved, id)
+    """)
+    # 按发布时间排序（display_number 编号、待审列表及其计数都走该索引的 approved = 0 区间）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkins_approved_created
+        ON check_ins(approved, created_ts, id)
+    """)
+    # 昵称前缀搜索（NOCASE 排序规则，LIKE 'xx%' 可走索引范围扫描）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkins_nickname
+        ON check_ins(nickname COLLATE NOCASE)
+    """)
+    # 邮箱精确搜索（大多数记录没有邮箱，只索引非空值）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkins_email
+        ON check_ins(email) WHERE email IS NOT NULL
+    """)
+    # 排除默认昵称
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_checkins_nondefault
+        ON check_ins(id) WHERE nickname != '用户0721'
+    """)
+    # 按 IP 查询已点赞记录（覆盖索引，只需扫描索引）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_likes_ip
+        ON likes(ip_address, checkin_id)
+    """)
+
+
+# 字段迁移列表：(迁移完成后的 user_version, 迁移函数)
+_MIGRATIONS = (
+    (2, migrate_v1_to_v2),
+    (3, migrate_v2_to_v3),
+    (4, migrate_v3_to_v4),
+    (5, migrate_v4_to_v5),
+    (6, migrate_v5_to_v6),
+    (7, migrate_v6_to_v7),
+    (8, migrate_v7_to_v8),
+)
+
+
+def run_migrations(cursor: sqlite3.Cursor):
+    """执行所有数据库迁移
+    
+    在调用方提供的连接上执行，不单独提交，由调用方统一 commit。
+    已完成的迁移记录在 PRAGMA user_version 中，再次启动时直接跳过；
+    表、触发器、索引的 ensure_* 检查均为 IF NOT EXISTS，每次都会执行。
+    """
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    
+    for target_version, migrate in _MIGRATIONS:
+        if version < target_version:
+            migrate(cursor)
+            cursor.execute(f"PRAGMA user_version = {target_version}")
     
-    try:
-        migrate_v1_to_v2(cursor, conn)
-        migrate_v2_to_v3(cursor, conn)
-        migrate_v3_to_v4(cursor, conn)
-        migrate_v4_to_v5(cursor, conn)
-        ensure_likes_table(cursor, conn)
-    finally:
-        conn.close()
+    ensure_likes_table(cursor)
+    ensure_triggers(cursor)
+    ensure_fts(cursor)
+    ensure_indexes(cursor)
@@ -1,15 +1,19 @@
 """数据模型定义"""
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
+from typing import Iterable, Optional, List
 
+import orjson
 
-@dataclass
+__all__ = ['CheckIn', 'checkins_to_json']
+
+
+@dataclass(slots=True)
 class CheckIn:
     """打卡记录模型"""
     id: Optional[int] = None
     content: str = ""
-    media_files: str = "[]"  # JSON 字符串，存储文件路径列表
+    media_files: List[str] = field(default_factory=list)  # 文件路径列表（读取时解析一次，写入时序列化）
     created_at: Optional[datetime] = None
     ip_address: Optional[str] = None
     # VERSION 2.0 新增字段
@@ -30,14 +34,20 @@ class CheckIn:
     # 动态计算的显示编号（不存储在数据库）
     display_number: Optional[int] = None
     
-    def to_dict(self) -> dict:
-        """转换为字典"""
-        return {
+    def to_dict(self, liked: Optional[bool] = None) -> dict:
+        """转换为字典（即 API 返回的最终结构）
+        
+        datetime 字段保持原样，由响应序列化（orjson / jsonable_encoder）处理。
+        
+        Args:
+            liked: 当前用户是否已点赞，为 None 时不包含该字段
+        """
+        data = {
             "id": self.id,
             "display_number": self.display_number,
             "content": self.content,
             "media_files": self.media_files,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
             "ip_address": self.ip_address,
             "nickname": self.nickname,
             "email": self.email,
@@ -48,6 +58,44 @@ class CheckIn:
             "file_type": self.file_type,
             "archive_metadata": self.archive_metadata,
             "approved": self.approved,
-            "reviewed_at": self.reviewed_at.isoformat() if self.reviewed_at else None,
+            "reviewed_at": self.reviewed_at,
             "review_reason": self.review_reason
         }
+        if liked is not None:
+            data["liked"] = liked
+        return data
+
+
+def checkins_to_json(
+    checkins: Iterable[CheckIn],
+    liked_ids: Optional[Iterable[int]] = None,
+    **fields
+) -> bytes:
+    """将打卡记录列表直接序列化为响应 JSON（不经过 to_dict 中间字典）
+    
+    orjson 原生序列化 slots dataclass 和 datetime，逐条序列化后拼接字节。
+    
+    Args:
+        checkins: 记录列表，放在 "data" 字段
+        liked_ids: 当前用户已点赞的记录ID集合，为 None 时不附带 liked 字段
+        **fields: 响应的其他顶层字段（success、total 等）
+    
+    Returns:
+        JSON 字节串
+    """
+    buf = bytearray(orjson.dumps(fields))
+    buf[-1:] = b',"data":[' if fields else b'"data":['
+    
+    for i, checkin in enumerate(checkins):
+        if i:
+            buf += b","
+        item = orjson.dumps(checkin)
+        if liked_ids is None:
+            buf += item
+        else:
+            # 去掉结尾的 }，补上 liked 字段
+            buf += item[:-1]
+            buf += b',"liked":true}' if checkin.id in liked_ids else b',"liked":false}'
+    
+    buf += b"]}"
+    return bytes(buf)
@@ -1,10 +1,164 @@
 """打卡记录数据访问层"""
-import json
+import asyncio
+import threading
+import time
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
 
 from ..models import CheckIn
-from ..connection import get_db
+from ..connection import fts_available, get_db
+
+
+# 查询列顺序（_row_to_checkin 按此顺序位置解包，修改时需同步）
+# 旧数据可能为 NULL 的字段在 SQL 中补默认值，Python 侧不再逐行判断
+_CHECKIN_COLUMNS = """id, content, media_files, created_at, ip_address,
+           COALESCE(nickname, '用户0721') AS nickname, email, qq, url,
+           COALESCE(avatar, '🥰') AS avatar, COALESCE(love, 0) AS love,
+           COALESCE(file_type, 'media') AS file_type, archive_metadata,
+           COALESCE(approved, 1) AS approved, reviewed_at, review_reason, created_ts"""
+
+# 固定 SQL 语句（模块级常量，配合 sqlite3 语句缓存复用预编译结果）
+# created_at（本地时间 ISO 字符串）由 SQLite 从 created_ts（?13）换算，不在 Python 中格式化
+_SQL_INSERT = """
+    INSERT INTO check_ins (
+        content, media_files, created_at, ip_address,
+        nickname, email, qq, url, avatar, file_type, archive_metadata, approved, review_reason,
+        created_ts
+    )
+    VALUES (
+        ?1, ?2, strftime('%Y-%m-%dT%H:%M:%S', ?13, 'unixepoch', 'localtime'), ?3,
+        ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, ?12,
+        ?13
+    )
+"""
+
+_SQL_GET_BY_ID = f"""
+    SELECT {_CHECKIN_COLUMNS}
+    FROM check_ins
+    WHERE id = ?
+"""
+
+_SQL_LAST_ROWID = "SELECT last_insert_rowid()"
+
+_SQL_PENDING_COUNT = "SELECT COUNT(*) FROM check_ins WHERE approved = 0"
+
+_SQL_PENDING_LIST = f"""
+    SELECT {_CHECKIN_COLUMNS}
+    FROM check_ins
+    WHERE approved = 0
+    ORDER BY created_ts DESC, id DESC
+    LIMIT ? OFFSET ?
+"""
+
+# 待审列表的 keyset 版本：从上一页最后一条 (created_ts, id) 之后继续读
+_SQL_PENDING_LIST_KEYSET = f"""
+    SELECT {_CHECKIN_COLUMNS}
+    FROM check_ins
+    WHERE approved = 0 AND (created_ts, id) < (?, ?)
+    ORDER BY created_ts DESC, id DESC
+    LIMIT ?
+"""
+
+# created_ts 为空的记录排在待审列表末尾（行值比较不会选中它们），单独按 id 接着读
+_SQL_PENDING_LIST_NULL_TS = f"""
+    SELECT {_CHECKIN_COLUMNS}
+    FROM check_ins
+    WHERE approved = 0 AND created_ts IS NULL
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+_SQL_PENDING_LIST_NULL_TS_KEYSET = f"""
+    SELECT {_CHECKIN_COLUMNS}
+    FROM check_ins
+    WHERE approved = 0 AND created_ts IS NULL AND id < ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+_SQL_APPROVE = """
+    UPDATE check_ins 
+    SET approved = 1, reviewed_at = strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')
+    WHERE id = ?
+"""
+
+_SQL_DELETE = "DELETE FROM check_ins WHERE id = ?"
+
+_SQL_BAN = """
+    UPDATE check_ins 
+    SET approved = 0
+    WHERE id = ?
+"""
+
+# display_number 编号（均为 idx_checkins_approved_created 上的范围计数，不取出行数据）
+_SQL_NUMBER_BEFORE = """
+    SELECT COUNT(*) FROM check_ins
+    WHERE approved = ? AND (created_ts, id) < (?, ?)
+"""
+# 从某条记录往后最多数 ? 条（靠近最新一端的记录用总数减去它，避免从头数起）
+_SQL_NUMBER_FROM_CAPPED = """
+    SELECT COUNT(*) FROM (
+        SELECT 1 FROM check_ins
+        WHERE approved = ? AND (created_ts, id) >= (?, ?)
+        LIMIT ?
+    )
+"""
+_SQL_NUMBER_BETWEEN = """
+    SELECT COUNT(*) FROM check_ins
+    WHERE approved = ? AND (created_ts, id) >= (?, ?) AND (created_ts, id) < (?, ?)
+"""
+_SQL_NUMBER_NULL_TS = "SELECT COUNT(*) FROM check_ins WHERE approved = ? AND created_ts IS NULL"
+_SQL_STAT_VALUE = "SELECT value FROM check_in_stats WHERE key = ?"
+
+# 往后计数的上限：超过时说明记录不靠近最新一端，改为从头计数
+_NUMBER_PROBE_LIMIT = 10000
+
+# 统计表由触发器维护（total / approved / pending 三行）
+_SQL_STATS = "SELECT key, value FROM check_in_stats"
+
+
+# ==================== 列表总数缓存 ====================
+
+# 相邻几次翻页之间总数几乎不会变化，短时间内复用 COUNT(*) 的结果
+_COUNT_CACHE_TTL = 5.0
+_count_cache: Dict[Tuple[str, tuple], Tuple[float, int]] = {}
+_count_cache_lock = threading.Lock()
+
+
+def _get_cached_count(count_sql: str, params: list) -> Optional[int]:
+    """读取未过期的总数缓存，没有时返回 None"""
+    with _count_cache_lock:
+        hit = _count_cache.get((count_sql, tuple(params)))
+    if hit is not None and time.monotonic() - hit[0] < _COUNT_CACHE_TTL:
+        return hit[1]
+    return None
+
+
+def _set_cached_count(count_sql: str, params: list, total: int):
+    """写入总数缓存"""
+    with _count_cache_lock:
+        # 过期条目在写入时顺带清理，避免筛选组合过多时无限增长
+        if len(_count_cache) > 256:
+            _count_cache.clear()
+        _count_cache[(count_sql, tuple(params))] = (time.monotonic(), total)
+
+
+def _cached_count(cursor, count_sql: str, params: list) -> int:
+    """执行列表总数查询，结果按 (SQL, 参数) 缓存 _COUNT_CACHE_TTL 秒"""
+    total = _get_cached_count(count_sql, params)
+    if total is None:
+        cursor.execute(count_sql, params)
+        total = cursor.fetchone()[0]
+        _set_cached_count(count_sql, params, total)
+    return total
+
+
+def _invalidate_count_cache():
+    """记录增删或审核状态变化后清空总数缓存"""
+    with _count_cache_lock:
+        _count_cache.clear()
 
 
 def create(
@@ -26,21 +180,66 @@ def create(
     Returns:
         新记录的ID
     """
-    media_json = json.dumps(media_files)
-    created_at = datetime.now().isoformat()
-    approved_int = 1 if approved else 0
+    row = _insert_params(
+        content, media_files, ip_address, nickname, email, qq, url,
+        avatar, file_type, archive_metadata, approved, review_reason
+    )
+    
+    with get_db() as conn:
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_INSERT, row)
+        new_id = cursor.lastrowid
+    
+    _invalidate_count_cache()
+    return new_id
+
+
+def create_many(records: List[Dict[str, Any]]) -> List[int]:
+    """批量创建打卡记录（单个事务，只提交一次）
+    
+    Args:
+        records: 记录列表，每项为 create() 的关键字参数字典
+    
+    Returns:
+        新记录的ID列表（与 records 顺序一致）
+    """
+    if not records:
+        return []
+    
+    rows = [_insert_params(**record) for record in records]
     
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO check_ins (
-                content, media_files, created_at, ip_address,
-                nickname, email, qq, url, avatar, file_type, archive_metadata, approved, review_reason
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (content, media_json, created_at, ip_address, nickname, email, qq, url, avatar, file_type, archive_metadata, approved_int, review_reason))
-        
-        return cursor.lastrowid
+        cursor.executemany(_SQL_INSERT, rows)
+        # 写连接持有写锁且 id 为 AUTOINCREMENT，同一事务内插入的 id 连续
+        last_id = cursor.execute(_SQL_LAST_ROWID).fetchone()[0]
+    
+    _invalidate_count_cache()
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+def _insert_params(
+    content: str,
+    media_files: List[str],
+    ip_address: Optional[str] = None,
+    nickname: str = "用户0721",
+    email: Optional[str] = None,
+    qq: Optional[str] = None,
+    url: Optional[str] = None,
+    avatar: str = "🥰",
+    file_type: str = "media",
+    archive_metadata: Optional[str] = None,
+    approved: bool = True,
+    review_reason: Optional[str] = None
+) -> tuple:
+    """按 _SQL_INSERT 的列顺序生成插入参数"""
+    media_json = orjson.dumps(media_files).decode()
+    approved_int = 1 if approved else 0
+    return (
+        content, media_json, ip_address, nickname, email, qq, url,
+        avatar, file_type, archive_metadata, approved_int, review_reason,
+        int(time.time())
+    )
 
 
 def get_list(
@@ -53,10 +252,18 @@ def get_list(
     content_keyword: Optional[str] = None,
     exclude_default_nickname: bool = False,
     min_content_length: Optional[int] = None,
-    approved_only: bool = True
-) -> Tuple[List[CheckIn], int]:
+    approved_only: bool = True,
+    cursor_id: Optional[int] = None,
+    cursor_love: Optional[int] = None,
+    include_total: bool = True,
+    nickname_prefix: Optional[str] = None,
+    only_pending: bool = False
+) -> Tuple[List[CheckIn], Optional[int]]:
     """获取打卡记录列表（支持搜索和筛选）
     
+    传入游标（上一页最后一条记录的 id / love）时使用 keyset 分页：
+    直接按排序键定位，不再扫描并丢弃 OFFSET 之前的行，此时忽略 page。
+    
     Args:
         page: 页码
         limit: 每页数量
@@ -68,124 +275,416 @@ def get_list(
         exclude_default_nickname: 排除默认昵称用户
         min_content_length: 最小内容长度
         approved_only: 仅显示已审核通过的记录（默认 True）
+        cursor_id: 游标 - 上一页最后一条记录的 ID
+        cursor_love: 游标 - 上一页最后一条记录的点赞数（sort_by=love 时需要）
+        include_total: 是否统计总数（无限滚动等不需要总数的场景可传 False）
+        nickname_prefix: 昵称前缀（前缀匹配，可使用昵称索引）
+        only_pending: 仅显示待审核的记录（优先于 approved_only，可使用待审部分索引）
     
     Returns:
-        (记录列表, 总数)
+        (记录列表, 总数)，include_total 为 False 时总数为 None
     """
-    # 构建 WHERE 条件（使用 numbered 表别名前缀）
-    where_clauses = []
-    params = []
+    count_sql, data_sql, params, page_params = _prepare_list_query(
+        page=page,
+        limit=limit,
+        sort_order=sort_order,
+        sort_by=sort_by,
+        nickname=nickname,
+        email=email,
+        content_keyword=content_keyword,
+        exclude_default_nickname=exclude_default_nickname,
+        min_content_length=min_content_length,
+        approved_only=approved_only,
+        cursor_id=cursor_id,
+        cursor_love=cursor_love,
+        nickname_prefix=nickname_prefix,
+        only_pending=only_pending
+    )
     
-    if nickname:
-        where_clauses.append("numbered.nickname LIKE ?")
-        params.append(f"%{nickname}%")
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        
+        # 获取总数（短时缓存）
+        total = _cached_count(cursor, count_sql, params) if include_total else None
+        
+        # 获取分页数据并计算编号
+        cursor.execute(data_sql, params + page_params)
+        rows = cursor.fetchall()
+        checkins = _attach_display_numbers(cursor, rows, _display_status(approved_only, only_pending))
+    
+    return checkins, total
+
+
+async def get_list_async(include_total: bool = True, **filters) -> Tuple[List[CheckIn], Optional[int]]:
+    """get_list 的异步版本（参数同 get_list）
+    
+    总数和分页数据在线程中分别使用两个只读连接并行查询（WAL 下读互不阻塞），
+    同时不阻塞事件循环。
+    """
+    count_sql, data_sql, params, page_params = _prepare_list_query(**filters)
+    status = _display_status(filters.get("approved_only", True), filters.get("only_pending", False))
+    
+    page_task = asyncio.to_thread(_fetch_page, data_sql, params + page_params, status)
+    total = _get_cached_count(count_sql, params) if include_total else None
+    
+    if include_total and total is None:
+        total, checkins = await asyncio.gather(
+            asyncio.to_thread(_fetch_count, count_sql, params),
+            page_task
+        )
+        _set_cached_count(count_sql, params, total)
+    else:
+        checkins = await page_task
+    
+    return checkins, total
+
+
+def _fetch_page(sql: str, params: list, status: Optional[int]) -> List[CheckIn]:
+    """在一个只读连接上查询一页数据并计算编号"""
+    with get_db(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return _attach_display_numbers(cursor, cursor.fetchall(), status)
+
+
+def _fetch_count(sql: str, params: list) -> int:
+    """在一个只读连接上执行 COUNT 查询"""
+    with get_db(readonly=True) as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def _prepare_list_query(
+    page: int = 1,
+    limit: int = 20,
+    sort_order: str = "desc",
+    sort_by: str = "id",
+    nickname: Optional[str] = None,
+    email: Optional[str] = None,
+    content_keyword: Optional[str] = None,
+    exclude_default_nickname: bool = False,
+    min_content_length: Optional[int] = None,
+    approved_only: bool = True,
+    cursor_id: Optional[int] = None,
+    cursor_love: Optional[int] = None,
+    nickname_prefix: Optional[str] = None,
+    only_pending: bool = False
+) -> Tuple[str, str, list, list]:
+    """根据筛选条件准备列表查询（参数同 get_list）
+    
+    Returns:
+        (计数 SQL, 分页数据 SQL, 筛选参数, 分页参数)
+    """
+    has_minlen = min_content_length is not None and min_content_length > 0
+    use_keyset = cursor_id is not None and (sort_by != "love" or cursor_love is not None)
+    # trigram 至少需要 3 个字符，更短的关键词仍用 LIKE
+    use_fts = bool(content_keyword) and len(content_keyword) >= 3 and fts_available()
+    nickname_fts = bool(nickname) and len(nickname) >= 3 and fts_available()
+    
+    # 筛选条件组合编码为位掩码，同一组合的 SQL 只拼接一次
+    mask = (
+        (_F_NICKNAME if nickname else 0)
+        | (_F_EMAIL if email else 0)
+        | (_F_CONTENT if content_keyword else 0)
+        | (_F_EXCLUDE_DEFAULT if exclude_default_nickname else 0)
+        | (_F_MINLEN if has_minlen else 0)
+        | (_F_APPROVED_ONLY if approved_only else 0)
+        | (_F_SORT_LOVE if sort_by == "love" else 0)
+        | (_F_SORT_ASC if sort_order == "asc" else 0)
+        | (_F_KEYSET if use_keyset else 0)
+        | (_F_FTS if use_fts else 0)
+        | (_F_NICKNAME_PREFIX if nickname_prefix else 0)
+        | (_F_ONLY_PENDING if only_pending else 0)
+        | (_F_NICKNAME_FTS if nickname_fts else 0)
+    )
+    list_sql = _list_sql_cache.get(mask)
+    if list_sql is None:
+        list_sql = _list_sql_cache[mask] = _build_list_sql(mask)
+    count_sql, data_sql = list_sql
     
+    # 参数顺序与 _build_list_sql 中 WHERE 条件的拼接顺序一致
+    params = []
+    if nickname:
+        if nickname_fts:
+            params.append(_fts_phrase("nickname", nickname))
+        else:
+            params.append(f"%{nickname}%")
+    if nickname_prefix:
+        params.append(_escape_like(nickname_prefix) + "%")
     if email:
-        where_clauses.append("numbered.email = ?")
         params.append(email)
-    
     if content_keyword:
-        where_clauses.append("numbered.content LIKE ?")
-        params.append(f"%{content_keyword}%")
+        if use_fts:
+            params.append(_fts_phrase("content", content_keyword))
+        else:
+            params.append(f"%{content_keyword}%")
+    if has_minlen:
+        params.append(min_content_length)
     
-    if exclude_default_nickname:
-        where_clauses.append("numbered.nickname != '用户0721'")
+    # 分页参数
+    if use_keyset:
+        if sort_by == "love":
+            page_params = [cursor_love, cursor_id, limit]
+        else:
+            page_params = [cursor_id, limit]
+    else:
+        page_params = [limit, (page - 1) * limit]
     
-    if min_content_length is not None and min_content_length > 0:
-        where_clauses.append("LENGTH(numbered.content) >= ?")
-        params.append(min_content_length)
+    return count_sql, data_sql, params, page_params
+
+
+# 列表查询的筛选条件位（组合成掩码作为 SQL 缓存的键）
+_F_NICKNAME = 1 << 0
+_F_EMAIL = 1 << 1
+_F_CONTENT = 1 << 2
+_F_EXCLUDE_DEFAULT = 1 << 3
+_F_MINLEN = 1 << 4
+_F_APPROVED_ONLY = 1 << 5
+_F_SORT_LOVE = 1 << 6
+_F_SORT_ASC = 1 << 7
+_F_KEYSET = 1 << 8
+_F_FTS = 1 << 9
+_F_NICKNAME_PREFIX = 1 << 10
+_F_ONLY_PENDING = 1 << 11
+_F_NICKNAME_FTS = 1 << 12
+
+# 掩码 -> (计数 SQL, 分页数据 SQL)，首次遇到某个组合时生成
+_list_sql_cache: Dict[int, Tuple[str, str]] = {}
+
+
+def _build_list_sql(mask: int) -> Tuple[str, str]:
+    """按筛选条件位掩码生成列表查询 SQL
+    
+    _F_KEYSET 置位时数据 SQL 以游标条件代替 OFFSET，
+    参数依次为: 筛选参数, [cursor_love,] cursor_id, limit
+    _F_FTS / _F_NICKNAME_FTS 置位时内容关键词 / 昵称通过全文索引 check_ins_fts 匹配
+    
+    Returns:
+        (计数 SQL, 分页数据 SQL)
+    """
+    has_nickname = bool(mask & _F_NICKNAME)
+    has_email = bool(mask & _F_EMAIL)
+    has_content = bool(mask & _F_CONTENT)
+    exclude_default = bool(mask & _F_EXCLUDE_DEFAULT)
+    has_minlen = bool(mask & _F_MINLEN)
+    approved_only = bool(mask & _F_APPROVED_ONLY)
+    sort_by = "love" if mask & _F_SORT_LOVE else "id"
+    sort_order = "asc" if mask & _F_SORT_ASC else "desc"
+    use_keyset = bool(mask & _F_KEYSET)
+    use_fts = bool(mask & _F_FTS)
+    has_nickname_prefix = bool(mask & _F_NICKNAME_PREFIX)
+    only_pending = bool(mask & _F_ONLY_PENDING)
+    nickname_fts = bool(mask & _F_NICKNAME_FTS)
+    
+    # 构建 WHERE 条件
+    where_clauses = []
+    
+    if has_nickname:
+        if nickname_fts:
+            where_clauses.append(
+                "id IN (SELECT rowid FROM check_ins_fts WHERE check_ins_fts MATCH ?)"
+            )
+        else:
+            where_clauses.append("nickname LIKE ?")
+    
+    if has_nickname_prefix:
+        where_clauses.append("nickname LIKE ? ESCAPE '\\'")
+    
+    if has_email:
+        where_clauses.append("email = ?")
+    
+    if has_content:
+        if use_fts:
+            where_clauses.append(
+                "id IN (SELECT rowid FROM check_ins_fts WHERE check_ins_fts MATCH ?)"
+            )
+        else:
+            where_clauses.append("content LIKE ?")
+    
+    if exclude_default:
+        where_clauses.append("nickname != '用户0721'")
+    
+    if has_minlen:
+        where_clauses.append("LENGTH(content) >= ?")
+    
+    # 审核状态过滤
+    if only_pending:
+        where_clauses.insert(0, "approved = 0")
+    elif approved_only:
+        where_clauses.insert(0, "approved = 1")
     
     where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
     
-    # 排序字段和方向
-    sort_column = "love" if sort_by == "love" else "id"
+    # 排序字段和方向（按点赞数排序时以 id 作为次序键，保证顺序稳定）
+    # 带表名前缀，避免解析为 SELECT 中 COALESCE 的同名别名而用不上索引
     order_direction = "ASC" if sort_order == "asc" else "DESC"
+    if sort_by == "love":
+        order_sql = f"check_ins.love {order_direction}, check_ins.id {order_direction}"
+    else:
+        order_sql = f"check_ins.id {order_direction}"
     
-    # 审核过滤条件（用于子查询）
-    approved_filter = "WHERE approved = 1" if approved_only else ""
+    # 分页方式：keyset 游标或 LIMIT/OFFSET
+    if use_keyset:
+        compare = ">" if sort_order == "asc" else "<"
+        if sort_by == "love":
+            page_where = f"(check_ins.love, check_ins.id) {compare} (?, ?)"
+        else:
+            page_where = f"check_ins.id {compare} ?"
+        data_where = f"{where_sql} AND {page_where}"
+        limit_sql = "LIMIT ?"
+    else:
+        data_where = where_sql
+        limit_sql = "LIMIT ? OFFSET ?"
     
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # 获取总数（这里用原始表名）
-        count_where = where_sql.replace("numbered.", "")
-        if approved_only:
-            count_where = f"approved = 1 AND ({count_where})"
-        count_sql = f"SELECT COUNT(*) as count FROM check_ins WHERE {count_where}"
-        cursor.execute(count_sql, params)
-        total = cursor.fetchone()["count"]
-        
-        # 获取分页数据，使用 ROW_NUMBER() 计算连续编号
-        # 注意：display_number 只计算已审核通过的记录
-        offset = (page - 1) * limit
-        data_sql = f"""
-            SELECT 
-                numbered.*
-            FROM (
-                SELECT 
-                    id, content, media_files, created_at, ip_address,
-                    nickname, email, qq, url, avatar, love, file_type, archive_metadata,
-                    approved, reviewed_at, review_reason,
-                    ROW_NUMBER() OVER (ORDER BY created_at ASC) as display_number
-                FROM check_ins
-                {approved_filter}
-            ) AS numbered
-            WHERE {where_sql}
-            ORDER BY numbered.{sort_column} {order_direction}
-            LIMIT ? OFFSET ?
-        """
-        cursor.execute(data_sql, params + [limit, offset])
-        rows = cursor.fetchall()
+    count_sql = f"SELECT COUNT(*) FROM check_ins WHERE {where_sql}"
+    
+    # 分页数据查询（display_number 在取出本页后由 _attach_display_numbers 计算）
+    data_sql = f"""
+        SELECT {_CHECKIN_COLUMNS}
+        FROM check_ins
+        WHERE {data_where}
+        ORDER BY {order_sql}
+        {limit_sql}
+    """
+    return count_sql, data_sql
+
+
+# 导入时预先生成公开列表最常见的组合（按 ID / 点赞数倒序，OFFSET 与游标两种翻页），
+# 首个请求也只需查表绑定参数
+_list_sql_cache.update(
+    (mask, _build_list_sql(mask))
+    for mask in (
+        _F_APPROVED_ONLY,
+        _F_APPROVED_ONLY | _F_KEYSET,
+        _F_APPROVED_ONLY | _F_SORT_LOVE,
+        _F_APPROVED_ONLY | _F_SORT_LOVE | _F_KEYSET,
+    )
+)
+
+
+def _display_status(approved_only: bool, only_pending: bool) -> Optional[int]:
+    """display_number 的编号范围：待审 0 / 已通过 1 / 全部 None"""
+    if only_pending:
+        return 0
+    if approved_only:
+        return 1
+    return None
+
+
+def _numbered_total(cursor, status: int) -> int:
+    """某审核状态下参与编号（created_ts 非空）的记录数"""
+    cursor.execute(_SQL_STAT_VALUE, ("approved" if status == 1 else "pending",))
+    row = cursor.fetchone()
+    cursor.execute(_SQL_NUMBER_NULL_TS, (status,))
+    return (row[0] if row else 0) - cursor.fetchone()[0]
+
+
+def _count_before(cursor, status: int, created_ts: int, checkin_id: int) -> int:
+    """某审核状态下排在 (created_ts, id) 之前的记录数，从较近的一端计数"""
+    cursor.execute(_SQL_NUMBER_FROM_CAPPED, (status, created_ts, checkin_id, _NUMBER_PROBE_LIMIT))
+    after = cursor.fetchone()[0]
+    if after < _NUMBER_PROBE_LIMIT:
+        return _numbered_total(cursor, status) - after
     
+    cursor.execute(_SQL_NUMBER_BEFORE, (status, created_ts, checkin_id))
+    return cursor.fetchone()[0]
+
+
+def _attach_display_numbers(cursor, rows: list, status: Optional[int]) -> List[CheckIn]:
+    """将本页数据行转换为 CheckIn，并计算连续编号 display_number
+    
+    编号 = 同一审核状态下按 (created_ts, id) 排序的序号（status 为 None 时两种状态合计）。
+    本页记录按该顺序排好后，只有第一条需要定位（从较近的一端计数），
+    之后每条加上与前一条之间的记录数；全部是索引上的 COUNT，不把行取到 Python 中。
+    created_ts 为空的记录不参与编号。
+    """
     checkins = [_row_to_checkin(row) for row in rows]
-    return checkins, total
+    keys = sorted((row[16], row[0], i) for i, row in enumerate(rows) if row[16] is not None)
+    statuses = (0, 1) if status is None else (status,)
+    
+    before = 0
+    previous = None
+    for created_ts, checkin_id, i in keys:
+        if previous is None:
+            before = sum(_count_before(cursor, s, created_ts, checkin_id) for s in statuses)
+        else:
+            for s in statuses:
+                cursor.execute(_SQL_NUMBER_BETWEEN, (s, *previous, created_ts, checkin_id))
+                before += cursor.fetchone()[0]
+        checkins[i].display_number = before + 1
+        previous = (created_ts, checkin_id)
+    return checkins
+
+
+def _fts_phrase(column: str, keyword: str) -> str:
+    """生成限定列的 FTS5 短语查询（关键词整体匹配，双引号转义）"""
+    return f'{column} : "' + keyword.replace('"', '""') + '"'
+
+
+def _escape_like(value: str) -> str:
+    """转义 LIKE 通配符（配合 ESCAPE '\\' 使用）"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 def get_by_id(checkin_id: int) -> Optional[CheckIn]:
     """根据ID获取打卡记录"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, content, media_files, created_at, ip_address,
-                   nickname, email, qq, url, avatar, love, file_type, archive_metadata,
-                   approved, reviewed_at, review_reason
-            FROM check_ins
-            WHERE id = ?
-        """, (checkin_id,))
+    with get_db(readonly=True) as conn:
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_GET_BY_ID, (checkin_id,))
         
         row = cursor.fetchone()
     
     return _row_to_checkin(row) if row else None
 
 
-def get_pending_list(page: int = 1, limit: int = 20) -> Tuple[List[CheckIn], int]:
+def get_pending_list(
+    page: int = 1,
+    limit: int = 20,
+    cursor_ts: Optional[int] = None,
+    cursor_id: Optional[int] = None
+) -> Tuple[List[CheckIn], int, Optional[dict]]:
     """获取待审核记录列表
     
+    按 (created_ts, id) 倒序，created_ts 为空的记录排在最后。
+    
+    Args:
+        page: 页码（未提供游标时使用 OFFSET 分页）
+        limit: 每页数量
+        cursor_ts: 上一页 next_cursor 的 cursor_ts（keyset 分页，为空表示已翻到 created_ts 为空的部分）
+        cursor_id: 上一页 next_cursor 的 cursor_id（传入时按游标翻页，忽略 page）
+    
     Returns:
-        (记录列表, 总数)
+        (记录列表, 总数, 下一页游标)，游标取自数据库中的 created_ts 原值，本页未满时为 None
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
+    with get_db(readonly=True) as conn:
+        cursor = conn.hot_cursor()
         
         # 获取总数
-        cursor.execute("SELECT COUNT(*) as count FROM check_ins WHERE approved = 0")
-        total = cursor.fetchone()["count"]
+        cursor.execute(_SQL_PENDING_COUNT)
+        total = cursor.fetchone()[0]
         
-        # 获取分页数据
-        offset = (page - 1) * limit
-        cursor.execute("""
-            SELECT id, content, media_files, created_at, ip_address,
-                   nickname, email, qq, url, avatar, love, file_type, archive_metadata,
-                   approved, reviewed_at, review_reason
-            FROM check_ins
-            WHERE approved = 0
-            ORDER BY created_at DESC
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
-        rows = cursor.fetchall()
+        # 获取分页数据：有游标时走索引定位，翻页代价与页码无关
+        if cursor_id is None:
+            offset = (page - 1) * limit
+            cursor.execute(_SQL_PENDING_LIST, (limit, offset))
+            rows = cursor.fetchall()
+        elif cursor_ts is None:
+            cursor.execute(_SQL_PENDING_LIST_NULL_TS_KEYSET, (cursor_id, limit))
+            rows = cursor.fetchall()
+        else:
+            cursor.execute(_SQL_PENDING_LIST_KEYSET, (cursor_ts, cursor_id, limit))
+            rows = cursor.fetchall()
+            # 有时间戳的记录已读完，接着读 created_ts 为空的部分
+            if len(rows) < limit:
+                cursor.execute(_SQL_PENDING_LIST_NULL_TS, (limit - len(rows),))
+                rows += cursor.fetchall()
+    
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = {"cursor_ts": last[16], "cursor_id": last[0]}
     
     checkins = [_row_to_checkin(row) for row in rows]
-    return checkins, total
+    return checkins, total, next_cursor
 
 
 def approve(checkin_id: int) -> bool:
@@ -194,15 +693,14 @@ def approve(checkin_id: int) -> bool:
     Returns:
         是否成功
     """
-    reviewed_at = datetime.now().isoformat()
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE check_ins 
-            SET approved = 1, reviewed_at = ?
-            WHERE id = ?
-        """, (reviewed_at, checkin_id))
-        return cursor.rowcount > 0
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_APPROVE, (checkin_id,))
+        changed = cursor.rowcount > 0
+    
+    if changed:
+        _invalidate_count_cache()
+    return changed
 
 
 def reject(checkin_id: int) -> bool:
@@ -212,9 +710,57 @@ def reject(checkin_id: int) -> bool:
         是否成功
     """
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM check_ins WHERE id = ?", (checkin_id,))
-        return cursor.rowcount > 0
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_DELETE, (checkin_id,))
+        changed = cursor.rowcount > 0
+    
+    if changed:
+        _invalidate_count_cache()
+    return changed
+
+
+def approve_many(checkin_ids: List[int]) -> int:
+    """批量通过审核（单个事务，只提交一次）
+    
+    Args:
+        checkin_ids: 记录ID列表
+    
+    Returns:
+        成功通过的记录数
+    """
+    if not checkin_ids:
+        return 0
+    
+    with get_db() as conn:
+        cursor = conn.hot_cursor()
+        cursor.executemany(_SQL_APPROVE, [(checkin_id,) for checkin_id in checkin_ids])
+        changed = cursor.rowcount
+    
+    if changed:
+        _invalidate_count_cache()
+    return changed
+
+
+def reject_many(checkin_ids: List[int]) -> int:
+    """批量拒绝审核（删除记录，单个事务，只提交一次）
+    
+    Args:
+        checkin_ids: 记录ID列表
+    
+    Returns:
+        成功删除的记录数
+    """
+    if not checkin_ids:
+        return 0
+    
+    with get_db() as conn:
+        cursor = conn.hot_cursor()
+        cursor.executemany(_SQL_DELETE, [(checkin_id,) for checkin_id in checkin_ids])
+        changed = cursor.rowcount
+    
+    if changed:
+        _invalidate_count_cache()
+    return changed
 
 
 def ban(checkin_id: int) -> bool:
@@ -224,86 +770,68 @@ def ban(checkin_id: int) -> bool:
         是否成功
     """
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE check_ins 
-            SET approved = 0
-            WHERE id = ?
-        """, (checkin_id,))
-        return cursor.rowcount > 0
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_BAN, (checkin_id,))
+        changed = cursor.rowcount > 0
+    
+    if changed:
+        _invalidate_count_cache()
+    return changed
 
 
 def get_stats() -> dict:
-    """获取统计信息"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM check_ins")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM check_ins WHERE approved = 1")
-        approved = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM check_ins WHERE approved = 0")
-        pending = cursor.fetchone()[0]
-        
+    """获取统计信息（读取触发器维护的计数，不扫表）"""
+    with get_db(readonly=True) as conn:
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_STATS)
+        counts = dict(cursor.fetchall())
+    
     return {
-        "total": total,
-        "approved": approved,
-        "pending": pending
+        "total": counts.get("total", 0),
+        "approved": counts.get("approved", 0),
+        "pending": counts.get("pending", 0)
     }
 
 
-def _row_to_checkin(row) -> CheckIn:
-    """将数据库行转换为 CheckIn 对象"""
-    # 获取新字段，兼容旧数据
-    try:
-        file_type = row["file_type"] or "media"
-    except (KeyError, IndexError):
-        file_type = "media"
-    
-    try:
-        archive_metadata = row["archive_metadata"]
-    except (KeyError, IndexError):
-        archive_metadata = None
-    
-    try:
-        display_number = row["display_number"]
-    except (KeyError, IndexError):
-        display_number = None
-    
-    try:
-        approved = bool(row["approved"]) if row["approved"] is not None else True
-    except (KeyError, IndexError):
-        approved = True
-    
-    try:
-        reviewed_at_str = row["reviewed_at"]
-        reviewed_at = datetime.fromisoformat(reviewed_at_str) if reviewed_at_str else None
-    except (KeyError, IndexError):
-        reviewed_at = None
-    
-    try:
-        review_reason = row["review_reason"]
-    except (KeyError, IndexError):
-        review_reason = None
+def _parse_media_files(media_json: Optional[str]) -> List[str]:
+    """解析 media_files JSON（空列表不做解析）"""
+    if not media_json or media_json == "[]":
+        return []
+    return orjson.loads(media_json)
+
+
+def _row_to_checkin(row: tuple) -> CheckIn:
+    """将数据库行转换为 CheckIn 对象
+    
+    行按 _CHECKIN_COLUMNS 的顺序位置解包；display_number 由 _attach_display_numbers 另行填充。
+    """
+    (
+        checkin_id, content, media_files, created_at, ip_address,
+        nickname, email, qq, url, avatar, love, file_type, archive_metadata,
+        approved, reviewed_at, review_reason, created_ts
+    ) = row
+    
+    # 优先使用整数时间戳（fromtimestamp 比解析 ISO 字符串快）
+    if created_ts is not None:
+        created_at = datetime.fromtimestamp(created_ts)
+    else:
+        created_at = datetime.fromisoformat(created_at)
     
     return CheckIn(
-        id=row["id"],
-        content=row["content"],
-        media_files=row["media_files"],
-        created_at=datetime.fromisoformat(row["created_at"]),
-        ip_address=row["ip_address"],
-        nickname=row["nickname"] or "用户0721",
-        email=row["email"],
-        qq=row["qq"],
-        url=row["url"],
-        avatar=row["avatar"] or "🥰",
-        love=row["love"] or 0,
+        id=checkin_id,
+        content=content,
+        media_files=_parse_media_files(media_files),
+        created_at=created_at,
+        ip_address=ip_address,
+        nickname=nickname,
+        email=email,
+        qq=qq,
+        url=url,
+        avatar=avatar,
+        love=love,
         file_type=file_type,
         archive_metadata=archive_metadata,
-        approved=approved,
-        reviewed_at=reviewed_at,
-        review_reason=review_reason,
-        display_number=display_number
+        approved=bool(approved),
+        reviewed_at=datetime.fromisoformat(reviewed_at) if reviewed_at else None,
+        review_reason=review_reason
     )
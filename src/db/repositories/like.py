@@ -1,10 +1,84 @@
 """点赞数据访问层"""
 import sqlite3
-from typing import List, Tuple
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
 
 from ..connection import get_db
 
 
+# 固定 SQL 语句（模块级常量，配合 sqlite3 语句缓存复用预编译结果）
+_SQL_GET_LOVE = "SELECT love FROM check_ins WHERE id = ?"
+
+# 记录存在且未点过赞时才插入（UPSERT 只忽略主键冲突，rowcount 为 0；
+# 其余约束错误照常抛出，不会被误报成重复点赞）
+_SQL_ADD_LIKE = """
+    INSERT INTO likes (checkin_id, ip_address)
+    SELECT ?, ? WHERE EXISTS (SELECT 1 FROM check_ins WHERE id = ?)
+    ON CONFLICT (checkin_id, ip_address) DO NOTHING
+"""
+
+_SQL_INCREMENT_LOVE = "UPDATE check_ins SET love = love + 1 WHERE id = ?"
+
+_SQL_INCREMENT_LOVE_RETURNING = "UPDATE check_ins SET love = love + 1 WHERE id = ? RETURNING love"
+
+# SQLite 3.35+ 支持 RETURNING，可在更新的同时取回点赞数
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_SQL_CHECK_LIKED = """
+    SELECT EXISTS (
+        SELECT 1 FROM likes 
+        WHERE checkin_id = ? AND ip_address = ?
+    )
+"""
+
+_SQL_GET_LIKED = """
+    SELECT checkin_id FROM likes 
+    WHERE ip_address = ?
+"""
+
+_SQL_GET_LIKED_LIMITED = _SQL_GET_LIKED + " LIMIT ?"
+
+# 每个 IP 已点赞的记录ID缓存（同一访客翻页、刷新时不再重复查询）
+# 本进程内点赞提交后立即失效；其他进程写入的点赞最多延迟 TTL 秒可见
+# 点赞数超过 _LIKED_CACHE_MAX_IDS 的 IP 不缓存，改为按页 IN 查询，避免每次未命中都加载全部记录
+_LIKED_CACHE_TTL = 30.0
+_LIKED_CACHE_MAX = 4096
+_LIKED_CACHE_MAX_IDS = 1000
+_liked_cache: Dict[str, Tuple[float, FrozenSet[int]]] = {}
+_liked_cache_lock = threading.Lock()
+# 每次失效时递增；加载期间发生过失效则不写入缓存，避免把提交前的旧结果缓存下来
+_liked_cache_version = 0
+
+
+def _get_cached_liked(ip_address: str) -> Optional[FrozenSet[int]]:
+    """读取未过期的已点赞缓存，没有时返回 None"""
+    with _liked_cache_lock:
+        hit = _liked_cache.get(ip_address)
+    if hit is not None and time.monotonic() - hit[0] < _LIKED_CACHE_TTL:
+        return hit[1]
+    return None
+
+
+def _set_cached_liked(ip_address: str, liked_ids: FrozenSet[int], version: int):
+    """写入已点赞缓存（version 为开始加载时的缓存版本）"""
+    with _liked_cache_lock:
+        if version != _liked_cache_version:
+            return
+        # 超出上限时整体清空，避免访客过多时无限增长
+        if len(_liked_cache) >= _LIKED_CACHE_MAX:
+            _liked_cache.clear()
+        _liked_cache[ip_address] = (time.monotonic(), liked_ids)
+
+
+def _invalidate_liked_cache(ip_address: str):
+    """该 IP 点赞提交后清除其缓存"""
+    global _liked_cache_version
+    with _liked_cache_lock:
+        _liked_cache_version += 1
+        _liked_cache.pop(ip_address, None)
+
+
 def add(checkin_id: int, ip_address: str) -> Tuple[bool, int, str]:
     """给记录点赞
     
@@ -16,39 +90,34 @@ def add(checkin_id: int, ip_address: str) -> Tuple[bool, int, str]:
         (是否成功, 当前点赞数, 消息)
     """
     with get_db() as conn:
-        cursor = conn.cursor()
+        cursor = conn.hot_cursor()
         
         try:
-            # 检查记录是否存在
-            cursor.execute("SELECT love FROM check_ins WHERE id = ?", (checkin_id,))
-            row = cursor.fetchone()
-            if not row:
-                return False, 0, "记录不存在"
-            
-            # 尝试插入点赞记录（如果已存在会失败）
-            cursor.execute("""
-                INSERT INTO likes (checkin_id, ip_address)
-                VALUES (?, ?)
-            """, (checkin_id, ip_address))
+            # 插入点赞记录（记录不存在或已点过赞时不插入）
+            cursor.execute(_SQL_ADD_LIKE, (checkin_id, ip_address, checkin_id))
             
-            # 更新点赞数
-            cursor.execute("""
-                UPDATE check_ins SET love = love + 1 WHERE id = ?
-            """, (checkin_id,))
+            if cursor.rowcount == 0:
+                # 区分记录不存在和重复点赞
+                cursor.execute(_SQL_GET_LOVE, (checkin_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return False, 0, "记录不存在"
+                return False, row[0], "你已经点过赞了"
             
-            # 获取最新点赞数
-            cursor.execute("SELECT love FROM check_ins WHERE id = ?", (checkin_id,))
+            # 更新点赞数并获取最新值
+            if _HAS_RETURNING:
+                cursor.execute(_SQL_INCREMENT_LOVE_RETURNING, (checkin_id,))
+            else:
+                cursor.execute(_SQL_INCREMENT_LOVE, (checkin_id,))
+                cursor.execute(_SQL_GET_LOVE, (checkin_id,))
             new_love = cursor.fetchone()[0]
             
-            return True, new_love, "点赞成功"
-            
-        except sqlite3.IntegrityError:
-            # 重复点赞
-            cursor.execute("SELECT love FROM check_ins WHERE id = ?", (checkin_id,))
-            current_love = cursor.fetchone()[0]
-            return False, current_love, "你已经点过赞了"
         except Exception as e:
             return False, 0, f"点赞失败: {str(e)}"
+    
+    # 事务已提交，此后只读连接能看到新点赞，再清除缓存
+    _invalidate_liked_cache(ip_address)
+    return True, new_love, "点赞成功"
 
 
 def check(checkin_id: int, ip_address: str) -> bool:
@@ -61,30 +130,58 @@ def check(checkin_id: int, ip_address: str) -> bool:
     Returns:
         是否已点赞
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 1 FROM likes 
-            WHERE checkin_id = ? AND ip_address = ?
-        """, (checkin_id, ip_address))
+    liked_ids = _get_cached_liked(ip_address)
+    if liked_ids is not None:
+        return checkin_id in liked_ids
+    
+    with get_db(readonly=True) as conn:
+        cursor = conn.hot_cursor()
+        cursor.execute(_SQL_CHECK_LIKED, (checkin_id, ip_address))
         
-        return cursor.fetchone() is not None
+        return cursor.fetchone()[0] == 1
 
 
-def get_liked_ids(ip_address: str) -> List[int]:
-    """获取某IP已点赞的所有记录ID
+def get_liked_ids(
+    ip_address: str,
+    checkin_ids: Optional[Iterable[int]] = None
+) -> FrozenSet[int]:
+    """获取某IP已点赞的记录ID
+    
+    点赞数不超过 _LIKED_CACHE_MAX_IDS 时查询该 IP 的全部已点赞记录并缓存
+    _LIKED_CACHE_TTL 秒，再按需取交集；超过时不缓存，只查询 checkin_ids 范围内的记录。
     
     Args:
         ip_address: IP地址
+        checkin_ids: 只在这些记录中查找（如当前页的记录），为 None 时返回全部
     
     Returns:
-        已点赞的记录ID列表
+        已点赞的记录ID集合
     """
-    with get_db() as conn:
+    liked_ids = _get_cached_liked(ip_address)
+    if liked_ids is not None:
+        return liked_ids if checkin_ids is None else liked_ids.intersection(checkin_ids)
+    
+    version = _liked_cache_version
+    with get_db(readonly=True) as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT checkin_id FROM likes 
-            WHERE ip_address = ?
-        """, (ip_address,))
+        cursor.execute(_SQL_GET_LIKED_LIMITED, (ip_address, _LIKED_CACHE_MAX_IDS + 1))
+        rows = cursor.fetchall()
         
-        return [row[0] for row in cursor.fetchall()]
+        if len(rows) <= _LIKED_CACHE_MAX_IDS:
+            liked_ids = frozenset(row[0] for row in rows)
+        elif checkin_ids is None:
+            cursor.execute(_SQL_GET_LIKED, (ip_address,))
+            return frozenset(row[0] for row in cursor.fetchall())
+        else:
+            params = [ip_address]
+            params.extend(checkin_ids)
+            if len(params) == 1:
+                return frozenset()
+            placeholders = ",".join("?" * (len(params) - 1))
+            cursor.execute(f"{_SQL_GET_LIKED} AND checkin_id IN ({placeholders})", params)
+            return frozenset(row[0] for row in cursor.fetchall())
+    
+    _set_cached_liked(ip_address, liked_ids, version)
+    if checkin_ids is None:
+        return liked_ids
+    return liked_ids.intersection(checkin_ids)
@@ -1,14 +1,11 @@
 """数据库初始化"""
 import sqlite3
-from .connection import DB_PATH
-from .migrations import run_migrations
+from .connection import ensure_initialized
+from .migrations import LIKES_TABLE_OPTIONS
 
 
-def create_tables():
-    """创建数据库表（V5.0 完整架构）"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+def create_tables(cursor: sqlite3.Cursor):
+    """创建数据库表（V8.0 完整架构）"""
     # 创建 check_ins 表
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS check_ins (
@@ -27,33 +24,31 @@ def create_tables():
             archive_metadata TEXT DEFAULT NULL,
             approved INTEGER DEFAULT 1,
             reviewed_at DATETIME DEFAULT NULL,
-            review_reason TEXT DEFAULT NULL
+            review_reason TEXT DEFAULT NULL,
+            created_ts INTEGER DEFAULT NULL
         )
     """)
     
-    # 创建 likes 表
-    cursor.execute("""
+    # 创建 likes 表（复合主键即唯一约束，无需额外索引）
+    cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS likes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
             checkin_id INTEGER NOT NULL,
             ip_address TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(checkin_id, ip_address),
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            PRIMARY KEY (checkin_id, ip_address),
             FOREIGN KEY (checkin_id) REFERENCES check_ins(id) ON DELETE CASCADE
-        )
+        ) {LIKES_TABLE_OPTIONS}
     """)
     
-    # 创建索引
+    # 创建统计表（计数由 V8.0 迁移初始化，之后由触发器维护）
     cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_likes_checkin_ip 
-        ON likes(checkin_id, ip_address)
+        CREATE TABLE IF NOT EXISTS check_in_stats (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
     """)
-    
-    conn.commit()
-    conn.close()
 
 
 def init_db():
-    """初始化数据库"""
-    create_tables()
-    run_migrations()
+    """初始化数据库（建表 + 迁移，每个进程只执行一次）"""
+    ensure_initialized()
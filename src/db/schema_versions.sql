@@ -143,6 +143,136 @@ CREATE TABLE IF NOT EXISTS likes (
 -- 为点赞查询创建索引
 CREATE INDEX IF NOT EXISTS idx_likes_checkin_ip ON likes(checkin_id, ip_address);
 
+-- ===================================
+-- VERSION 6.0 - 整数时间戳
+-- 创建时间: 2026-10-16
+-- 说明: 新增整数时间戳字段，排序与读取不再解析 ISO 时间字符串
+-- 变更内容:
+--   - 新增 created_ts 字段，发布时间的 Unix 时间戳（秒）
+--   - created_at 仍保留（本地时间 ISO 字符串），供脚本和导出使用
+--   - 新增触发器 trg_checkins_created_ts：插入时未提供 created_ts 则由 created_at 换算
+--   - 新增索引 idx_checkins_created_ts，display_number 编号与待审列表按 created_ts 排序
+--   - 新增全文索引 check_ins_fts（FTS5 trigram，content + nickname 两列），
+--     内容关键词和昵称模糊搜索不再全表扫描
+--     关键词少于 3 个字符、SQLite 不支持 FTS5 或 FTS_SEARCH=0 时回退到 LIKE
+--   - 使用 PRAGMA user_version 记录已完成的迁移（与主版本号一致），启动时跳过已完成的迁移
+-- ===================================
+
+CREATE TABLE IF NOT EXISTS check_ins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL,
+    media_files TEXT DEFAULT '[]',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    ip_address TEXT,
+    -- VERSION 2.0 新增字段
+    nickname TEXT DEFAULT '用户0721',
+    email TEXT,
+    qq TEXT,
+    url TEXT,
+    avatar TEXT DEFAULT '🥰',
+    -- VERSION 3.0 新增字段
+    love INTEGER DEFAULT 0,
+    -- VERSION 4.0 新增字段
+    file_type TEXT DEFAULT 'media',
+    archive_metadata TEXT DEFAULT NULL,
+    -- VERSION 5.0 新增字段
+    approved INTEGER DEFAULT 1,
+    reviewed_at DATETIME DEFAULT NULL,
+    review_reason TEXT DEFAULT NULL,
+    -- VERSION 6.0 新增字段
+    created_ts INTEGER DEFAULT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_checkins_created_ts ON check_ins(created_ts, id);
+
+CREATE TRIGGER IF NOT EXISTS trg_checkins_created_ts
+AFTER INSERT ON check_ins
+WHEN NEW.created_ts IS NULL
+BEGIN
+    UPDATE check_ins
+    SET created_ts = CAST(strftime('%s', NEW.created_at, 'utc') AS INTEGER)
+    WHERE id = NEW.id;
+END;
+
+-- 内容全文索引（外部内容表，由触发器同步）
+CREATE VIRTUAL TABLE IF NOT EXISTS check_ins_fts USING fts5(
+    content, nickname, content='check_ins', content_rowid='id', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_checkins_fts_ai AFTER INSERT ON check_ins BEGIN
+    INSERT INTO check_ins_fts(rowid, content, nickname) VALUES (NEW.id, NEW.content, NEW.nickname);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_checkins_fts_ad AFTER DELETE ON check_ins BEGIN
+    INSERT INTO check_ins_fts(check_ins_fts, rowid, content, nickname) VALUES ('delete', OLD.id, OLD.content, OLD.nickname);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_checkins_fts_au AFTER UPDATE OF content, nickname ON check_ins BEGIN
+    INSERT INTO check_ins_fts(check_ins_fts, rowid, content, nickname) VALUES ('delete', OLD.id, OLD.content, OLD.nickname);
+    INSERT INTO check_ins_fts(rowid, content, nickname) VALUES (NEW.id, NEW.content, NEW.nickname);
+END;
+
+-- ===================================
+-- VERSION 7.0 - 精简点赞表
+-- 创建时间: 2026-10-16
+-- 说明: likes 表改为复合主键的 WITHOUT ROWID 表（SQLite 3.37+ 同时启用 STRICT）
+-- 变更内容:
+--   - 去掉自增 id，(checkin_id, ip_address) 作为主键，同时承担唯一约束
+--   - 删除冗余索引 idx_likes_checkin_ip，每次点赞少写一棵 B 树
+--   - created_at 改为 Unix 时间戳（秒）
+-- check_ins 表结构与 V6.0 相同
+-- ===================================
+
+CREATE TABLE IF NOT EXISTS likes (
+    checkin_id INTEGER NOT NULL,
+    ip_address TEXT NOT NULL,
+    created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    PRIMARY KEY (checkin_id, ip_address),
+    FOREIGN KEY (checkin_id) REFERENCES check_ins(id) ON DELETE CASCADE
+) WITHOUT ROWID, STRICT;
+
+CREATE INDEX IF NOT EXISTS idx_likes_ip ON likes(ip_address, checkin_id);
+
+-- 列表索引（keyset 分页）：审核状态作为前缀，排序与游标定位都在索引内完成
+-- 替代 V6.0 的 idx_checkins_created_ts、待审部分索引 idx_checkins_pending 与单列的 love 索引，
+-- 由 ensure_indexes 自动调整
+CREATE INDEX IF NOT EXISTS idx_checkins_approved_love ON check_ins(approved, love DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_checkins_approved_id ON check_ins(approved, id);
+CREATE INDEX IF NOT EXISTS idx_checkins_approved_created ON check_ins(approved, created_ts, id);
+
+-- ===================================
+-- VERSION 8.0 - 统计表
+-- 创建时间: 2026-10-16
+-- 说明: 审核统计改为读取触发器维护的计数，不再每次 COUNT(*) 扫表
+-- 变更内容:
+--   - 新增 check_in_stats 表（total / approved / pending 三行）
+--   - 新增触发器 trg_checkins_stats_ai / ad / au：插入、删除、修改 approved 时同步计数
+-- check_ins、likes 表结构与 V7.0 相同
+-- ===================================
+
+CREATE TABLE IF NOT EXISTS check_in_stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_checkins_stats_ai AFTER INSERT ON check_ins BEGIN
+    UPDATE check_in_stats SET value = value + 1
+    WHERE key = 'total' OR (key = 'approved' AND NEW.approved = 1) OR (key = 'pending' AND NEW.approved = 0);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_checkins_stats_ad AFTER DELETE ON check_ins BEGIN
+    UPDATE check_in_stats SET value = value - 1
+    WHERE key = 'total' OR (key = 'approved' AND OLD.approved = 1) OR (key = 'pending' AND OLD.approved = 0);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_checkins_stats_au AFTER UPDATE OF approved ON check_ins
+WHEN OLD.approved IS NOT NEW.approved BEGIN
+    UPDATE check_in_stats
+    SET value = value + CASE key
+        WHEN 'approved' THEN (NEW.approved IS 1) - (OLD.approved IS 1)
+        ELSE (NEW.approved IS 0) - (OLD.approved IS 0)
+    END
+    WHERE key IN ('approved', 'pending');
+END;
+
 -- ===================================
 -- 迁移说明
 -- ===================================
@@ -168,4 +298,24 @@ CREATE INDEX IF NOT EXISTS idx_likes_checkin_ip ON likes(checkin_id, ip_address)
 -- ALTER TABLE check_ins ADD COLUMN reviewed_at DATETIME DEFAULT NULL;
 -- ALTER TABLE check_ins ADD COLUMN review_reason TEXT DEFAULT NULL;
 -- UPDATE check_ins SET approved = 1 WHERE approved IS NULL;
+--
+-- 从 V5.0 迁移到 V6.0:
+-- ALTER TABLE check_ins ADD COLUMN created_ts INTEGER DEFAULT NULL;
+-- UPDATE check_ins SET created_ts = CAST(strftime('%s', created_at, 'utc') AS INTEGER);
+-- CREATE INDEX idx_checkins_created_ts ON check_ins(created_ts, id);
+-- CREATE TRIGGER trg_checkins_created_ts ...;
+-- CREATE VIRTUAL TABLE check_ins_fts USING fts5(...);
+-- INSERT INTO check_ins_fts(check_ins_fts) VALUES ('rebuild');
+-- CREATE TRIGGER trg_checkins_fts_ai / trg_checkins_fts_ad / trg_checkins_fts_au ...;
+--
+-- 从 V6.0 迁移到 V7.0:
+-- CREATE TABLE likes_new (...) WITHOUT ROWID, STRICT;
+-- INSERT INTO likes_new SELECT checkin_id, ip_address, CAST(strftime('%s', created_at) AS INTEGER) FROM likes;
+-- DROP TABLE likes;
+-- ALTER TABLE likes_new RENAME TO likes;
+--
+-- 从 V7.0 迁移到 V8.0:
+-- CREATE TABLE check_in_stats (...) WITHOUT ROWID;
+-- INSERT INTO check_in_stats SELECT 'total', COUNT(*) FROM check_ins UNION ALL ...;
+-- CREATE TRIGGER trg_checkins_stats_ai / trg_checkins_stats_ad / trg_checkins_stats_au ...;
 -- ===================================
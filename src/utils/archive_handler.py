@@ -1,49 +1,91 @@
 """压缩包处理工具"""
-import base64
+import binascii
 import io
 import json
-import re
-import shutil
+import os
 import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
+from typing import Callable, Iterator, List, Tuple, Dict, Optional
 import py7zr
 from PIL import Image
 
 
+# 扩展名集合均为小写、不含点，配合 _extension() 使用
 # 支持的图片格式
-IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp'}
+IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp'})
 # 支持的压缩包格式
-ARCHIVE_EXTENSIONS = {'.zip', '.7z'}
+ARCHIVE_EXTENSIONS = frozenset({'zip', '7z'})
 # 最大解压大小（防止压缩炸弹）- 500MB
 MAX_EXTRACTED_SIZE = 500 * 1024 * 1024
 
 # 危险文件扩展名（可能包含恶意代码）
-DANGEROUS_EXTENSIONS = {
+DANGEROUS_EXTENSIONS = frozenset({
     # 可执行文件
-    '.exe', '.bat', '.cmd', '.com', '.msi', '.scr', '.pif',
-    '.app', '.dmg', '.pkg',  # macOS
-    '.sh', '.bin', '.run',   # Linux
+    'exe', 'bat', 'cmd', 'com', 'msi', 'scr', 'pif',
+    'app', 'dmg', 'pkg',  # macOS
+    'sh', 'bin', 'run',   # Linux
     # 脚本文件
-    '.js', '.vbs', '.vbe', '.jse', '.ws', '.wsf', '.wsc', '.wsh',
-    '.ps1', '.psm1', '.psd1',  # PowerShell
-    '.py', '.pyw', '.pyc', '.pyo',  # Python
-    '.rb', '.pl', '.php',  # 其他脚本
+    'js', 'vbs', 'vbe', 'jse', 'ws', 'wsf', 'wsc', 'wsh',
+    'ps1', 'psm1', 'psd1',  # PowerShell
+    'py', 'pyw', 'pyc', 'pyo',  # Python
+    'rb', 'pl', 'php',  # 其他脚本
     # Office 宏
-    '.docm', '.xlsm', '.pptm', '.dotm', '.xltm', '.potm',
+    'docm', 'xlsm', 'pptm', 'dotm', 'xltm', 'potm',
     # 其他危险文件
-    '.jar', '.class',  # Java
-    '.dll', '.sys', '.drv',  # Windows 系统文件
-    '.lnk', '.url',  # 快捷方式
-    '.reg',  # 注册表
-    '.hta', '.html', '.htm',  # 可能包含脚本的网页
-    '.svg',  # 可能包含 JavaScript
-}
+    'jar', 'class',  # Java
+    'dll', 'sys', 'drv',  # Windows 系统文件
+    'lnk', 'url',  # 快捷方式
+    'reg',  # 注册表
+    'hta', 'html', 'htm',  # 可能包含脚本的网页
+    'svg',  # 可能包含 JavaScript
+})
+
+
+def _extension(name: str) -> str:
+    """返回压缩包内路径的小写扩展名（不含点），没有扩展名时返回空字符串
+    
+    与 Path(name).suffix 的判断一致（以点开头的隐藏文件没有扩展名），
+    但只做字符串切分，遍历上万个文件名时不必逐个构造 Path 对象。
+    """
+    stem, dot, ext = name.rpartition('/')[2].rpartition('.')
+    if not dot or not stem:
+        return ''
+    return ext.lower()
+
+
+# 缩略图线程池：Pillow 解码、缩放、编码以及 zlib 解压都会释放 GIL，
+# 线程即可利用多核，且无需在进程间复制图片数据
+_THUMBNAIL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1),
+    thread_name_prefix="thumbnail"
+)
+
+
+def _to_jpeg_data_uri(img: Image.Image, quality: int) -> str:
+    """将图片编码为 JPEG 并返回 Base64 data URI
+    
+    直接对 BytesIO 的内部缓冲区做 Base64（binascii，C 实现），不额外复制 JPEG 数据。
+    """
+    # 处理透明图片
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGB')
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    with buffer.getbuffer() as view:
+        b64_data = binascii.b2a_base64(view, newline=False)
+    return "data:image/jpeg;base64," + b64_data.decode('ascii')
 
 
 class ArchiveHandler:
-    """压缩包处理器"""
+    """压缩包处理器
+    
+    在 with handler.open(): 块内，各方法共用同一个已打开的压缩包，
+    不再每次重新解析 ZIP 中央目录 / 7z 头部；块外调用时各自临时打开。
+    """
     
     def __init__(self, archive_path: Path):
         """初始化处理器
@@ -53,6 +95,9 @@ class ArchiveHandler:
         """
         self.archive_path = archive_path
         self.archive_type = self._get_archive_type()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._7z: Optional[py7zr.SevenZipFile] = None
+        self._names: Optional[List[str]] = None
         
     def _get_archive_type(self) -> str:
         """获取压缩包类型"""
@@ -64,42 +109,128 @@ class ArchiveHandler:
         else:
             raise ValueError(f"不支持的压缩包格式: {ext}")
     
+    @contextmanager
+    def open(self) -> Iterator["ArchiveHandler"]:
+        """打开压缩包并在块内复用（可嵌套，只有最外层负责关闭）"""
+        if self._zip is not None or self._7z is not None:
+            yield self
+            return
+        
+        if self.archive_type == 'zip':
+            self._zip = zipfile.ZipFile(self.archive_path, 'r')
+        else:  # 7z
+            self._7z = py7zr.SevenZipFile(self.archive_path, 'r')
+        try:
+            yield self
+        finally:
+            if self._zip is not None:
+                self._zip.close()
+            if self._7z is not None:
+                self._7z.close()
+            self._zip = None
+            self._7z = None
+    
     def list_files(self) -> List[str]:
-        """列出压缩包中的所有文件
+        """列出压缩包中的所有文件（结果缓存，压缩包内容不会变化）
         
         Returns:
             文件路径列表
         """
+        if self._names is not None:
+            return self._names
+        
         try:
-            if self.archive_type == 'zip':
-                with zipfile.ZipFile(self.archive_path, 'r') as zf:
-                    return zf.namelist()
-            else:  # 7z
-                with py7zr.SevenZipFile(self.archive_path, 'r') as szf:
-                    return szf.getnames()
+            with self.open():
+                if self.archive_type == 'zip':
+                    self._names = self._zip.namelist()
+                else:  # 7z
+                    self._names = self._7z.getnames()
         except Exception as e:
             raise ValueError(f"无法读取压缩包: {str(e)}")
+        return self._names
+    
+    def iter_entries(self) -> Iterator[Tuple[str, int, bool]]:
+        """逐条遍历压缩包成员（不缓存文件名列表）
+        
+        Yields:
+            (文件路径, 解压后大小, 是否为目录)
+        """
+        with self.open():
+            if self.archive_type == 'zip':
+                for info in self._zip.infolist():
+                    yield info.filename, info.file_size, info.is_dir()
+            else:  # 7z
+                for info in self._7z.list():
+                    yield info.filename, info.uncompressed or 0, info.is_directory
+    
+    def _iter_names(self) -> Iterator[str]:
+        """逐个产出成员文件名，不构造完整列表（已缓存时直接遍历缓存）"""
+        if self._names is not None:
+            yield from self._names
+            return
+        
+        with self.open():
+            if self.archive_type == 'zip':
+                for info in self._zip.filelist:
+                    yield info.filename
+            else:  # 7z
+                yield from self._7z.getnames()
     
     def list_images(self) -> List[str]:
-        """列出压缩包中的所有图片文件
+        """列出压缩包中的所有图片文件（单次遍历文件名，跳过目录）
         
         Returns:
             图片文件路径列表
         """
-        all_files = self.list_files()
-        images = []
+        try:
+            return [
+                file_path for file_path in self._iter_names()
+                if not file_path.endswith('/') and _extension(file_path) in IMAGE_EXTENSIONS
+            ]
+        except Exception as e:
+            raise ValueError(f"无法读取压缩包: {str(e)}")
+    
+    def _extract_7z(self, targets: List[str], temp_path: Path) -> None:
+        """将 7z 中的多个文件一次性提取到临时目录（需在 open() 块内调用）"""
+        # py7zr 每次提取后需要 reset 才能再次读取
+        self._7z.reset()
+        self._7z.extract(temp_path, targets=targets)
+    
+    def read_files(self, file_paths: List[str]) -> Dict[str, bytes]:
+        """批量读取压缩包内文件的内容
         
-        for file_path in all_files:
-            # 跳过目录
-            if file_path.endswith('/'):
-                continue
+        7z 的多个文件在一次解压中取出。不存在的路径不会出现在结果中。
+        
+        Args:
+            file_paths: 压缩包内的文件路径列表
             
-            # 检查扩展名
-            ext = Path(file_path).suffix.lower()
-            if ext in IMAGE_EXTENSIONS:
-                images.append(file_path)
+        Returns:
+            {路径: 文件内容}
+        """
+        # 只读取压缩包中真实存在的成员，避免拼接临时目录路径时越界
+        names = set(self.list_files())
+        targets = [path for path in dict.fromkeys(file_paths) if path in names]
+        if not targets:
+            return {}
         
-        return images
+        result = {}
+        with self.open():
+            if self.archive_type == 'zip':
+                for path in targets:
+                    result[path] = self._zip.read(path)
+            else:  # 7z
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    temp_path = Path(temp_dir)
+                    self._extract_7z(targets, temp_path)
+                    for path in targets:
+                        extracted = temp_path / path
+                        if extracted.is_file():
+                            result[path] = extracted.read_bytes()
+        return result
+    
+    def read_file(self, file_path: str) -> Optional[bytes]:
+        """读取压缩包内单个文件的内容，不存在时返回 None"""
+        return self.read_files([file_path]).get(file_path)
     
     def extract_file(self, file_path: str, output_dir: Path) -> Path:
         """从压缩包中提取单个文件
@@ -118,27 +249,13 @@ class ArchiveHandler:
         output_path = output_dir / safe_filename
         
         try:
-            if self.archive_type == 'zip':
-                with zipfile.ZipFile(self.archive_path, 'r') as zf:
-                    # 读取文件内容
-                    data = zf.read(file_path)
-                    # 写入到输出路径
-                    output_path.write_bytes(data)
-            else:  # 7z
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    with py7zr.SevenZipFile(self.archive_path, 'r') as szf:
-                        # 7z需要先提取到临时目录
-                        szf.extract(temp_path, targets=[file_path])
-                        # 找到提取的文件并移动
-                        extracted = temp_path / file_path
-                        if extracted.exists():
-                            shutil.copy2(extracted, output_path)
-                        else:
-                            raise FileNotFoundError(f"文件提取失败: {file_path}")
+            data = self.read_file(file_path)
         except Exception as e:
             raise ValueError(f"提取文件失败: {str(e)}")
+        if data is None:
+            raise ValueError(f"提取文件失败: 文件不存在 {file_path}")
         
+        output_path.write_bytes(data)
         return output_path
     
     def get_metadata(self) -> Dict:
@@ -147,14 +264,22 @@ class ArchiveHandler:
         Returns:
             元数据字典
         """
-        all_files = self.list_files()
-        images = self.list_images()
+        # 单次遍历同时统计文件数与图片数
+        total_files = 0
+        image_count = 0
+        try:
+            for file_path in self._iter_names():
+                total_files += 1
+                if not file_path.endswith('/') and _extension(file_path) in IMAGE_EXTENSIONS:
+                    image_count += 1
+        except Exception as e:
+            raise ValueError(f"无法读取压缩包: {str(e)}")
         
         return {
             "filename": self.archive_path.name,
             "size": self.archive_path.stat().st_size,
-            "total_files": len(all_files),
-            "image_count": len(images)
+            "total_files": total_files,
+            "image_count": image_count
         }
     
     def get_image_thumbnail(self, file_path: str, max_size: int = 200) -> Optional[str]:
@@ -169,40 +294,24 @@ class ArchiveHandler:
         """
         try:
             # 提取图片数据
-            if self.archive_type == 'zip':
-                with zipfile.ZipFile(self.archive_path, 'r') as zf:
-                    data = zf.read(file_path)
-            else:  # 7z
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    with py7zr.SevenZipFile(self.archive_path, 'r') as szf:
-                        szf.extract(temp_path, targets=[file_path])
-                        extracted = temp_path / file_path
-                        if extracted.exists():
-                            data = extracted.read_bytes()
-                        else:
-                            return None
+            data = self.read_file(file_path)
+            if data is None:
+                return None
             
-            # 生成缩略图
+            # 生成缩略图（JPEG 按 1/2、1/4、1/8 缩放解码，非 JPEG 时 draft 不起作用）
             img = Image.open(io.BytesIO(data))
+            img.draft('RGB', (max_size * 2, max_size * 2))
             img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
             
             # 转换为 JPEG 格式的 Base64
-            buffer = io.BytesIO()
-            # 处理透明图片
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            img.save(buffer, format='JPEG', quality=85)
-            b64_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            return f"data:image/jpeg;base64,{b64_data}"
+            return _to_jpeg_data_uri(img, quality=85)
             
         except Exception as e:
             print(f"生成缩略图失败 {file_path}: {str(e)}")
             return None
     
     def get_thumbnails(self, image_list: List[str], max_count: int = 50) -> List[Dict]:
-        """批量生成图片缩略图（优化版：只打开一次压缩包）
+        """批量生成图片缩略图（只打开一次压缩包，解码与缩放在线程池中并行）
         
         Args:
             image_list: 图片路径列表
@@ -211,58 +320,55 @@ class ArchiveHandler:
         Returns:
             包含路径和缩略图的字典列表
         """
-        result = []
         images_to_process = image_list[:max_count]
+        thumbnails: List[Optional[str]] = [None] * len(images_to_process)
         
         try:
-            if self.archive_type == 'zip':
-                # ZIP: 打开一次，批量读取
-                with zipfile.ZipFile(self.archive_path, 'r') as zf:
-                    for img_path in images_to_process:
-                        try:
-                            data = zf.read(img_path)
-                            thumbnail = self._generate_thumbnail(data)
-                            result.append({
-                                "path": img_path,
-                                "name": Path(img_path).name,
-                                "thumbnail": thumbnail
-                            })
-                        except Exception as e:
-                            result.append({
-                                "path": img_path,
-                                "name": Path(img_path).name,
-                                "thumbnail": None
-                            })
-            else:
-                # 7z: 批量提取到临时目录
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    with py7zr.SevenZipFile(self.archive_path, 'r') as szf:
-                        szf.extract(temp_path, targets=images_to_process)
-                    
-                    for img_path in images_to_process:
-                        try:
-                            extracted = temp_path / img_path
-                            if extracted.exists():
-                                data = extracted.read_bytes()
-                                thumbnail = self._generate_thumbnail(data)
-                            else:
-                                thumbnail = None
-                            result.append({
-                                "path": img_path,
-                                "name": Path(img_path).name,
-                                "thumbnail": thumbnail
-                            })
-                        except Exception:
-                            result.append({
-                                "path": img_path,
-                                "name": Path(img_path).name,
-                                "thumbnail": None
-                            })
+            with self.open():
+                if self.archive_type == 'zip':
+                    # ZIP: 各线程通过同一个句柄按需读取（ZipFile 读取成员是线程安全的）
+                    zf = self._zip
+                    thumbnails = list(_THUMBNAIL_EXECUTOR.map(
+                        lambda img_path: self._thumbnail_from(zf.read, img_path),
+                        images_to_process
+                    ))
+                else:
+                    # 7z: 一次性提取到临时目录，再并行读取生成
+                    names = set(self.list_files())
+                    targets = [path for path in images_to_process if path in names]
+                    with tempfile.TemporaryDirectory() as temp_dir:
+                        temp_path = Path(temp_dir)
+                        if targets:
+                            self._extract_7z(targets, temp_path)
+                        
+                        def read_extracted(path: str) -> bytes:
+                            if path not in names:
+                                raise KeyError(path)
+                            return (temp_path / path).read_bytes()
+                        
+                        thumbnails = list(_THUMBNAIL_EXECUTOR.map(
+                            lambda img_path: self._thumbnail_from(read_extracted, img_path),
+                            images_to_process
+                        ))
         except Exception as e:
             print(f"批量生成缩略图失败: {str(e)}")
         
-        return result
+        return [
+            {
+                "path": img_path,
+                "name": Path(img_path).name,
+                "thumbnail": thumbnail
+            }
+            for img_path, thumbnail in zip(images_to_process, thumbnails)
+        ]
+    
+    def _thumbnail_from(self, read: Callable[[str], bytes], img_path: str) -> Optional[str]:
+        """读取单张图片并生成缩略图（在线程池中执行，失败返回 None）"""
+        try:
+            data = read(img_path)
+        except Exception:
+            return None
+        return self._generate_thumbnail(data)
     
     def _generate_thumbnail(self, data: bytes, max_size: int = 200) -> Optional[str]:
         """从图片数据生成缩略图
@@ -276,15 +382,12 @@ class ArchiveHandler:
         """
         try:
             img = Image.open(io.BytesIO(data))
+            # JPEG 直接按 1/2、1/4、1/8 缩放解码，避免解出整张原图
+            # 注意不要在 thumbnail() 前 copy()，否则会触发完整解码
+            img.draft('RGB', (max_size * 2, max_size * 2))
             img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
             
-            buffer = io.BytesIO()
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            img.save(buffer, format='JPEG', quality=75)  # 降低质量加速
-            b64_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            return f"data:image/jpeg;base64,{b64_data}"
+            return _to_jpeg_data_uri(img, quality=75)  # 降低质量加速
         except Exception:
             return None
     
@@ -300,40 +403,43 @@ class ArchiveHandler:
         """
         try:
             # 提取图片数据
-            if self.archive_type == 'zip':
-                with zipfile.ZipFile(self.archive_path, 'r') as zf:
-                    data = zf.read(file_path)
-            else:  # 7z
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    with py7zr.SevenZipFile(self.archive_path, 'r') as szf:
-                        szf.extract(temp_path, targets=[file_path])
-                        extracted = temp_path / file_path
-                        if extracted.exists():
-                            data = extracted.read_bytes()
-                        else:
-                            return None
+            data = self.read_file(file_path)
+            if data is None:
+                return None
             
             # 生成较大的预览图
             img = Image.open(io.BytesIO(data))
-            # 只有当图片超过 max_size 时才缩放
+            # 只有当图片超过 max_size 时才缩放（大 JPEG 先缩放解码，保留 2 倍余量给 LANCZOS）
             if img.width > max_size or img.height > max_size:
+                img.draft('RGB', (max_size * 2, max_size * 2))
                 img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
             
             # 转换为 JPEG 格式的 Base64
-            buffer = io.BytesIO()
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            img.save(buffer, format='JPEG', quality=90)
-            b64_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            return f"data:image/jpeg;base64,{b64_data}"
+            return _to_jpeg_data_uri(img, quality=90)
             
         except Exception as e:
             print(f"生成预览图失败 {file_path}: {str(e)}")
             return None
 
 
+def _first_number(text: str) -> Optional[int]:
+    """返回字符串中第一段连续数字的值，没有数字时返回 None
+    
+    逐字符扫描，第一段数字结束即停止（isdecimal 与正则 \\d 匹配的字符一致）。
+    """
+    start = None
+    for index, char in enumerate(text):
+        if char.isdecimal():
+            if start is None:
+                start = index
+        elif start is not None:
+            return int(text[start:index])
+    
+    if start is None:
+        return None
+    return int(text[start:])
+
+
 def smart_select_preview_images(
     image_list: List[str],
     count: int = 3
@@ -357,18 +463,13 @@ def smart_select_preview_images(
     
     # 尝试找出带数字编号的图片
     numbered_images = []
-    pattern = re.compile(r'(\d+)')
     
     for img_path in image_list:
-        filename = Path(img_path).stem
-        matches = pattern.findall(filename)
-        if matches:
-            # 提取第一个数字作为排序依据
-            try:
-                number = int(matches[0])
-                numbered_images.append((number, img_path))
-            except ValueError:
-                pass
+        # 提取第一个数字作为排序依据
+        filename = img_path.rpartition('/')[2]
+        number = _first_number(filename.rpartition('.')[0] or filename)
+        if number is not None:
+            numbered_images.append((number, img_path))
     
     # 如果找到带编号的图片，按编号排序并取前N个
     if numbered_images:
@@ -399,41 +500,49 @@ def extract_preview_images(
     """
     handler = ArchiveHandler(archive_path)
     
-    # 获取元数据
-    metadata = handler.get_metadata()
-    
-    # 确定要提取的图片
-    if selected_images:
-        # 使用手动指定的图片
-        images_to_extract = selected_images
-    else:
-        # 自动选择
-        all_images = handler.list_images()
-        images_to_extract = smart_select_preview_images(all_images, auto_select_count)
+    # 元数据、图片列表与图片内容共用同一次打开（7z 的多张图片一次解压取出）
+    with handler.open():
+        # 获取元数据
+        metadata = handler.get_metadata()
+        
+        # 确定要提取的图片
+        if selected_images:
+            # 使用手动指定的图片
+            images_to_extract = selected_images
+        else:
+            # 自动选择
+            all_images = handler.list_images()
+            images_to_extract = smart_select_preview_images(all_images, auto_select_count)
+        
+        try:
+            image_data = handler.read_files(images_to_extract)
+        except Exception as e:
+            print(f"提取预览图失败: {str(e)}")
+            image_data = {}
     
     # 创建预览目录
     preview_dir.mkdir(parents=True, exist_ok=True)
     
-    # 提取图片
+    # 写出图片
     preview_urls = []
     for idx, img_path in enumerate(images_to_extract):
         try:
-            # 提取文件
-            extracted_path = handler.extract_file(img_path, preview_dir)
+            data = image_data.get(img_path)
+            if data is None:
+                raise ValueError(f"文件不存在 {img_path}")
             
             # 验证是否为有效图片
             try:
-                with Image.open(extracted_path) as img:
+                with Image.open(io.BytesIO(data)) as img:
                     img.verify()
             except Exception:
                 # 不是有效图片，跳过
-                extracted_path.unlink(missing_ok=True)
                 continue
             
-            # 重命名为统一格式
-            new_filename = f"preview_{idx + 1}{extracted_path.suffix}"
+            # 统一命名（只取文件扩展名，避免路径遍历）
+            new_filename = f"preview_{idx + 1}{Path(img_path).suffix}"
             new_path = preview_dir / new_filename
-            extracted_path.rename(new_path)
+            new_path.write_bytes(data)
             
             # 生成相对URL（假设 preview_dir 在 static/uploads/ 下）
             # 例如: /static/uploads/2026-01/previews/123/preview_1.jpg
@@ -462,27 +571,28 @@ def validate_archive(archive_path: Path) -> Tuple[bool, str]:
         (是否有效, 错误信息)
     """
     # 检查文件扩展名
-    ext = archive_path.suffix.lower()
-    if ext not in ARCHIVE_EXTENSIONS:
-        return False, f"不支持的压缩包格式: {ext}"
+    if _extension(archive_path.name) not in ARCHIVE_EXTENSIONS:
+        return False, f"不支持的压缩包格式: {archive_path.suffix.lower()}"
     
     try:
         handler = ArchiveHandler(archive_path)
         
-        # 尝试列出文件
-        files = handler.list_files()
-        
-        # 检查文件数量（防止过多文件）
-        if len(files) > 10000:
-            return False, "压缩包文件数量过多（超过10000个）"
-        
-        # 检查是否包含危险文件
+        # 单次遍历：同时统计数量、累计解压大小、检查危险文件
+        file_count = 0
+        total_size = 0
         dangerous_files = []
-        for file_path in files:
-            if file_path.endswith('/'):
+        for file_path, file_size, is_dir in handler.iter_entries():
+            # 检查文件数量（防止过多文件），超出后不再继续读取
+            file_count += 1
+            if file_count > 10000:
+                return False, "压缩包文件数量过多（超过10000个）"
+            
+            if is_dir:
                 continue  # 跳过目录
-            file_ext = Path(file_path).suffix.lower()
-            if file_ext in DANGEROUS_EXTENSIONS:
+            total_size += file_size
+            
+            # 检查是否包含危险文件
+            if _extension(file_path) in DANGEROUS_EXTENSIONS:
                 dangerous_files.append(Path(file_path).name)
         
         if dangerous_files:
@@ -491,12 +601,9 @@ def validate_archive(archive_path: Path) -> Tuple[bool, str]:
             more = f"等 {len(dangerous_files)} 个" if len(dangerous_files) > 5 else ""
             return False, f"压缩包包含可能有危险的文件类型: {', '.join(shown_files)}{more}"
         
-        # 估算解压后大小（简单检查）
-        if ext == '.zip':
-            with zipfile.ZipFile(archive_path, 'r') as zf:
-                total_size = sum(info.file_size for info in zf.infolist())
-                if total_size > MAX_EXTRACTED_SIZE:
-                    return False, f"解压后大小超过限制（{MAX_EXTRACTED_SIZE / 1024 / 1024:.0f}MB）"
+        # 估算解压后大小（按成员记录的原始大小）
+        if total_size > MAX_EXTRACTED_SIZE:
+            return False, f"解压后大小超过限制（{MAX_EXTRACTED_SIZE / 1024 / 1024:.0f}MB）"
         
         return True, ""
         
@@ -513,5 +620,4 @@ def is_archive_file(filename: str) -> bool:
     Returns:
         是否为压缩包
     """
-    ext = Path(filename).suffix.lower()
-    return ext in ARCHIVE_EXTENSIONS
+    return _extension(filename) in ARCHIVE_EXTENSIONS
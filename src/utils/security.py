@@ -5,14 +5,28 @@
 - 黑名单管理
 """
 
+import atexit
+import heapq
+import ipaddress
+import socket
+import struct
+import threading
 import time
 import re
-import hashlib
+from hashlib import blake2b
+from collections import OrderedDict
+from array import array
+from bisect import bisect_left
 from pathlib import Path
-from typing import Optional, Tuple, Dict
-from collections import defaultdict
+from typing import Optional, Tuple, Dict, List
 from functools import lru_cache
 
+# geoip2 缺失时不影响启动，国家检测退回到中国 IP 段的备用方案
+try:
+    import geoip2.database
+except ImportError:
+    geoip2 = None
+
 # 数据目录
 DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -23,24 +37,101 @@ GEOIP_DB_FILE = DATA_DIR / "GeoLite2-Country.mmdb"
 
 # ============ IP 黑名单管理 ============
 
+# 黑名单内存缓存：文件的 (mtime_ns, size) 不变时直接复用，不再每次请求读文件
+# 管理接口和脚本直接追加写文件，签名变化后下次检查自动重新加载
+_blacklist_cache: Optional[set] = None
+_blacklist_signature: Optional[Tuple[int, int]] = None
+_blacklist_lock = threading.Lock()
+
+# 新增黑名单条目先写入内存缓存并排队，由后台线程批量追加到文件
+# （每 _BLACKLIST_FLUSH_INTERVAL 秒或攒满 _BLACKLIST_FLUSH_BATCH 条写一次，进程退出时写完剩余条目）
+_BLACKLIST_FLUSH_INTERVAL = 1.0
+_BLACKLIST_FLUSH_BATCH = 32
+_blacklist_pending: List[str] = []
+_blacklist_cond = threading.Condition(_blacklist_lock)
+_blacklist_writer: Optional[threading.Thread] = None
+
+
+def _blacklist_file_signature() -> Optional[Tuple[int, int]]:
+    """获取黑名单文件签名，文件不存在时返回 None"""
+    try:
+        stat = BLACKLIST_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 def load_blacklist() -> set:
-    """加载 IP 黑名单"""
-    if not BLACKLIST_FILE.exists():
-        return set()
+    """加载 IP 黑名单（文件未变化时返回缓存）"""
+    global _blacklist_cache, _blacklist_signature
+    
+    signature = _blacklist_file_signature()
+    if _blacklist_cache is not None and signature == _blacklist_signature:
+        return _blacklist_cache
     
     blacklist = set()
-    with open(BLACKLIST_FILE, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                blacklist.add(line)
+    if signature is not None:
+        with open(BLACKLIST_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    blacklist.add(line)
+    
+    with _blacklist_lock:
+        # 尚未写入文件的条目保留在缓存中
+        blacklist.update(_blacklist_pending)
+        _blacklist_cache = blacklist
+        _blacklist_signature = signature
     return blacklist
 
 
+def flush_blacklist() -> None:
+    """把排队中的黑名单条目一次性追加到文件"""
+    global _blacklist_signature
+    
+    with _blacklist_lock:
+        if not _blacklist_pending:
+            return
+        
+        cache_fresh = _blacklist_file_signature() == _blacklist_signature
+        with open(BLACKLIST_FILE, 'a', encoding='utf-8') as f:
+            f.writelines(f"{ip}\n" for ip in _blacklist_pending)
+        _blacklist_pending.clear()
+        # 缓存与文件一致时同步更新签名，避免下次检查时重新读文件；
+        # 期间文件被其他进程改过则保留旧签名，下次检查时重新加载
+        if cache_fresh:
+            _blacklist_signature = _blacklist_file_signature()
+
+
+def _blacklist_writer_loop() -> None:
+    """后台线程：有新条目时等待凑批或超时，然后写入文件"""
+    while True:
+        with _blacklist_cond:
+            _blacklist_cond.wait_for(lambda: _blacklist_pending)
+            _blacklist_cond.wait_for(
+                lambda: len(_blacklist_pending) >= _BLACKLIST_FLUSH_BATCH,
+                timeout=_BLACKLIST_FLUSH_INTERVAL
+            )
+        flush_blacklist()
+
+
 def add_to_blacklist(ip: str) -> None:
-    """添加 IP 到黑名单"""
-    with open(BLACKLIST_FILE, 'a', encoding='utf-8') as f:
-        f.write(f"{ip}\n")
+    """添加 IP 到黑名单（立即生效，文件写入由后台线程批量完成）"""
+    global _blacklist_writer
+    
+    load_blacklist()
+    with _blacklist_cond:
+        _blacklist_cache.add(ip)
+        _blacklist_pending.append(ip)
+        
+        if _blacklist_writer is None:
+            _blacklist_writer = threading.Thread(
+                target=_blacklist_writer_loop, name="blacklist-writer", daemon=True
+            )
+            _blacklist_writer.start()
+            atexit.register(flush_blacklist)
+        
+        _blacklist_cond.notify()
 
 
 def is_blacklisted(ip: str) -> bool:
@@ -51,8 +142,9 @@ def is_blacklisted(ip: str) -> bool:
 
 # ============ IP 地理位置检测 ============
 
-# GeoIP 数据库读取器（懒加载）
+# GeoIP 数据库读取器（懒加载，首次使用时把整个数据库读入内存）
 _geoip_reader = None
+_geoip_lock = threading.Lock()
 
 def _get_geoip_reader():
     """获取 GeoIP 数据库读取器"""
@@ -61,15 +153,19 @@ def _get_geoip_reader():
     if _geoip_reader is not None:
         return _geoip_reader
     
-    if not GEOIP_DB_FILE.exists():
-        return None
-    
-    try:
-        import geoip2.database
-        _geoip_reader = geoip2.database.Reader(str(GEOIP_DB_FILE))
-        return _geoip_reader
-    except Exception:
-        return None
+    with _geoip_lock:
+        # 双重检查：并发请求只打开一次数据库
+        if _geoip_reader is not None:
+            return _geoip_reader
+        
+        if geoip2 is None or not GEOIP_DB_FILE.exists():
+            return None
+        
+        try:
+            _geoip_reader = geoip2.database.Reader(str(GEOIP_DB_FILE), mode=geoip2.database.MODE_MEMORY)
+            return _geoip_reader
+        except Exception:
+            return None
 
 
 def get_country_code(ip: str) -> Optional[str]:
@@ -79,10 +175,17 @@ def get_country_code(ip: str) -> Optional[str]:
     Returns:
         国家代码（如 'CN', 'US', 'NL'）或 None
     """
-    # 跳过本地 IP
-    if ip in ('127.0.0.1', 'localhost', '::1') or ip.startswith('192.168.') or ip.startswith('10.'):
+    # 跳过本地 / 内网 IP
+    if _is_local_ip(ip):
         return 'LOCAL'
     
+    return _lookup_country_code(ip)
+
+
+# 查询结果按 IP 缓存（回访用户、爬虫的 IP 重复率高），命中时不再查询 GeoIP 数据库
+@lru_cache(maxsize=65536)
+def _lookup_country_code(ip: str) -> Optional[str]:
+    """查询公网 IP 的国家代码（结果缓存）"""
     reader = _get_geoip_reader()
     if reader is None:
         # 没有数据库，使用备用方案：中国 IP 段检测
@@ -95,15 +198,58 @@ def get_country_code(ip: str) -> Optional[str]:
         return None
 
 
+def clear_country_cache() -> None:
+    """清空国家代码缓存（更新 GeoIP 数据库后调用）"""
+    _lookup_country_code.cache_clear()
+
+
+# IPv4 文本 -> 4 字节 -> 无符号整数（均为 C 实现，模块级绑定省去属性查找）
+_inet_pton = socket.inet_pton
+_unpack_u32 = struct.Struct('!I').unpack
+
+
 def ip_to_int(ip: str) -> int:
-    """将 IP 地址转换为整数"""
+    """将 IP 地址转换为整数（非法或非 IPv4 地址返回 0）"""
     try:
-        parts = ip.split('.')
-        return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
-    except Exception:
+        return _unpack_u32(_inet_pton(socket.AF_INET, ip))[0]
+    except (OSError, TypeError):
         return 0
 
 
+# 本地 / 内网 IPv4 段（回环、私有网络、链路本地），与中国 IP 段一样用二分查找判断
+_PRIVATE_IP_RANGES = sorted(
+    (ip_to_int(start), ip_to_int(end)) for start, end in (
+        ("10.0.0.0", "10.255.255.255"),
+        ("127.0.0.0", "127.255.255.255"),
+        ("169.254.0.0", "169.254.255.255"),
+        ("172.16.0.0", "172.31.255.255"),
+        ("192.168.0.0", "192.168.255.255"),
+    )
+)
+_PRIVATE_IP_STARTS = array('L', [start for start, _ in _PRIVATE_IP_RANGES])
+_PRIVATE_IP_ENDS = array('L', [end for _, end in _PRIVATE_IP_RANGES])
+
+
+def _is_local_ip(ip: str) -> bool:
+    """是否为本地 / 内网地址（IPv4 按整数段判断，IPv6 交给 ipaddress）"""
+    if ip == 'localhost':
+        return True
+    
+    ip_int = ip_to_int(ip)
+    if ip_int:
+        index = bisect_left(_PRIVATE_IP_ENDS, ip_int)
+        return index < len(_PRIVATE_IP_ENDS) and _PRIVATE_IP_STARTS[index] <= ip_int
+    
+    if ':' in ip:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return addr.is_private or addr.is_loopback or addr.is_link_local
+    
+    return False
+
+
 # 中国 IP 段（简化版，覆盖主要段）
 # 来源：APNIC 分配给中国的主要 IP 段
 # 使用懒加载避免启动时计算
@@ -194,16 +340,32 @@ def _get_china_ip_ranges():
     return _CHINA_IP_RANGES
 
 
+# 按起始地址排序后拆成两个平坦数组（各 IP 段互不重叠），用二分查找定位
+_CHINA_IP_STARTS: Optional[array] = None
+_CHINA_IP_ENDS: Optional[array] = None
+
+
+def _get_china_ip_bounds() -> Tuple[array, array]:
+    """获取中国 IP 段的起始 / 结束地址数组（懒加载）"""
+    global _CHINA_IP_STARTS, _CHINA_IP_ENDS
+    if _CHINA_IP_ENDS is None:
+        ranges = sorted(_get_china_ip_ranges())
+        _CHINA_IP_STARTS = array('L', [start for start, _ in ranges])
+        _CHINA_IP_ENDS = array('L', [end for _, end in ranges])
+    return _CHINA_IP_STARTS, _CHINA_IP_ENDS
+
+
 def _check_china_ip_range(ip: str) -> Optional[str]:
     """使用 IP 段检查是否为中国 IP（备用方案）"""
     ip_int = ip_to_int(ip)
     if ip_int == 0:
         return None
     
-    china_ranges = _get_china_ip_ranges()
-    for start, end in china_ranges:
-        if start <= ip_int <= end:
-            return 'CN'
+    # 第一个结束地址 >= ip 的段，再确认 ip 不小于它的起始地址
+    starts, ends = _get_china_ip_bounds()
+    index = bisect_left(ends, ip_int)
+    if index < len(ends) and starts[index] <= ip_int:
+        return 'CN'
     
     return None
 
@@ -234,17 +396,25 @@ def is_blocked_country(ip: str) -> Tuple[bool, Optional[str]]:
 
 # ============ 请求频率限制 ============
 
-# 内存中的请求记录 {ip: [(timestamp, action), ...]}
-_request_history: Dict[str, list] = defaultdict(list)
-
 # 配置
 RATE_LIMIT_WINDOW = 60  # 时间窗口（秒）
 RATE_LIMIT_MAX_REQUESTS = 10  # 窗口内最大请求数（写入操作）
 RATE_LIMIT_BAN_DURATION = 300  # 超限后封禁时长（秒）
 
+# 令牌桶 {ip: (剩余令牌数, 上次更新时间)}
+# 桶容量为 RATE_LIMIT_MAX_REQUESTS，每秒补充 RATE_LIMIT_MAX_REQUESTS / RATE_LIMIT_WINDOW 个令牌，
+# 每个 IP 只保存两个浮点数，检查为 O(1)
+_buckets: Dict[str, Tuple[float, float]] = {}
+_REFILL_PER_SECOND = RATE_LIMIT_MAX_REQUESTS / RATE_LIMIT_WINDOW
+
 # 临时封禁记录 {ip: ban_until_timestamp}
 _temp_bans: Dict[str, float] = {}
 
+# 封禁到期小顶堆 [(ban_until_timestamp, ip)]，每次检查时从堆顶清理已到期的封禁，
+# 避免大量不再访问的 IP 一直留在 _temp_bans 中
+_temp_ban_heap: List[Tuple[float, str]] = []
+_TEMP_BAN_PURGE_LIMIT = 64  # 每次检查最多清理的条数，控制单次请求耗时
+
 
 def check_rate_limit(ip: str, action: str = "write") -> Tuple[bool, str]:
     """
@@ -262,6 +432,14 @@ def check_rate_limit(ip: str, action: str = "write") -> Tuple[bool, str]:
     
     now = time.time()
     
+    # 清理已到期的封禁（堆中记录已被覆盖或删除时跳过）
+    for _ in range(_TEMP_BAN_PURGE_LIMIT):
+        if not _temp_ban_heap or _temp_ban_heap[0][0] > now:
+            break
+        ban_until, banned_ip = heapq.heappop(_temp_ban_heap)
+        if _temp_bans.get(banned_ip) == ban_until:
+            del _temp_bans[banned_ip]
+    
     # 检查是否在临时封禁中
     if ip in _temp_bans:
         if now < _temp_bans[ip]:
@@ -270,31 +448,31 @@ def check_rate_limit(ip: str, action: str = "write") -> Tuple[bool, str]:
         else:
             del _temp_bans[ip]
     
-    # 清理过期记录
-    _request_history[ip] = [
-        (ts, act) for ts, act in _request_history[ip]
-        if now - ts < RATE_LIMIT_WINDOW
-    ]
-    
-    # 统计窗口内的写入请求数
-    write_count = sum(1 for ts, act in _request_history[ip] if act == "write")
+    # 按经过的时间补充令牌（不超过桶容量）
+    tokens, last = _buckets.get(ip, (RATE_LIMIT_MAX_REQUESTS, now))
+    tokens = min(RATE_LIMIT_MAX_REQUESTS, tokens + (now - last) * _REFILL_PER_SECOND)
     
-    if write_count >= RATE_LIMIT_MAX_REQUESTS:
-        # 超限，临时封禁
+    if tokens < 1:
+        # 令牌耗尽，临时封禁
         _temp_bans[ip] = now + RATE_LIMIT_BAN_DURATION
+        heapq.heappush(_temp_ban_heap, (_temp_bans[ip], ip))
+        _buckets[ip] = (tokens, now)
         return False, f"请求过于频繁，已被临时限制 {RATE_LIMIT_BAN_DURATION} 秒"
     
-    # 记录本次请求
-    _request_history[ip].append((now, action))
+    # 消耗一个令牌
+    _buckets[ip] = (tokens - 1, now)
     
     return True, ""
 
 
 # ============ 内容哈希去重 ============
 
-# 最近提交内容的哈希 {hash: timestamp}
-_content_hashes: Dict[str, float] = {}
+# 最近提交内容的哈希 {hash: timestamp}，按写入顺序排列（最早的在最前）
+# 哈希为 16 字节 BLAKE2b 原始摘要（仅用于去重，不需要十六进制字符串）
+# 时间戳随写入单调递增，清理时只需从头部弹出过期项，遇到第一个未过期项即停止
+_content_hashes: "OrderedDict[bytes, float]" = OrderedDict()
 DUPLICATE_WINDOW = 300  # 5分钟内不允许重复内容
+DUPLICATE_MAX_ENTRIES = 10000  # 最多记录的哈希数，超出时淘汰最早的
 
 
 def check_duplicate_content(content: str) -> Tuple[bool, str]:
@@ -304,21 +482,22 @@ def check_duplicate_content(content: str) -> Tuple[bool, str]:
     Returns:
         (是否允许, 错误信息)
     """
-    now = time.time()
+    now = time.monotonic()
     
-    # 清理过期哈希
-    expired = [h for h, ts in _content_hashes.items() if now - ts > DUPLICATE_WINDOW]
-    for h in expired:
-        del _content_hashes[h]
+    # 从头部清理过期哈希
+    while _content_hashes and now - next(iter(_content_hashes.values())) > DUPLICATE_WINDOW:
+        _content_hashes.popitem(last=False)
     
     # 计算内容哈希
-    content_hash = hashlib.md5(content.strip().encode()).hexdigest()
+    content_hash = blake2b(content.strip().encode('utf-8'), digest_size=16).digest()
     
     if content_hash in _content_hashes:
         return False, "内容重复，请勿短时间内重复提交相同内容"
     
-    # 记录哈希
+    # 记录哈希（超出上限时淘汰最早的）
     _content_hashes[content_hash] = now
+    if len(_content_hashes) > DUPLICATE_MAX_ENTRIES:
+        _content_hashes.popitem(last=False)
     
     return True, ""
 
@@ -5,6 +5,13 @@ from pathlib import Path
 from typing import Optional, Tuple
 
 
+# 可选依赖：安装 pyahocorasick 时用 Aho-Corasick 自动机匹配关键词
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
 # ============ 垃圾关键词加载 ============
 
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -12,6 +19,30 @@ SPAM_KEYWORDS_FILE = DATA_DIR / "spam_keywords.txt"
 
 _spam_keywords: list = []
 
+# 关键词匹配器（加载关键词时构建，一次扫描检测全部关键词）
+# 有 pyahocorasick 时为 Aho-Corasick 自动机，否则为所有关键词合并的预编译正则
+_spam_automaton = None
+_spam_re: Optional[re.Pattern] = None
+
+
+def _build_spam_matcher(keywords: list) -> None:
+    """根据关键词列表构建匹配器"""
+    global _spam_automaton, _spam_re
+    
+    _spam_automaton = None
+    _spam_re = None
+    if not keywords:
+        return
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        _spam_automaton = automaton
+    else:
+        _spam_re = re.compile('|'.join(map(re.escape, keywords)))
+
 
 def _load_spam_keywords() -> list:
     """加载垃圾关键词列表"""
@@ -30,6 +61,7 @@ def _load_spam_keywords() -> list:
             if line and not line.startswith('#'):
                 keywords.append(line.lower())
     
+    _build_spam_matcher(keywords)
     _spam_keywords = keywords
     return keywords
 
@@ -38,6 +70,7 @@ def reload_spam_keywords() -> None:
     """重新加载垃圾关键词（用于热更新）"""
     global _spam_keywords
     _spam_keywords = []
+    _build_spam_matcher([])
     _load_spam_keywords()
 
 
@@ -60,6 +93,31 @@ def sanitize_html(text: str) -> str:
     return html.escape(text, quote=True)
 
 
+# 危险的 HTML 标签和属性
+_XSS_PATTERNS = [
+    r'<\s*script',
+    r'<\s*iframe',
+    r'<\s*object',
+    r'<\s*embed',
+    r'<\s*form',
+    r'<\s*input',
+    r'<\s*link',
+    r'<\s*meta',
+    r'<\s*style',
+    r'<\s*svg',
+    r'<\s*math',
+    r'javascript\s*:',
+    r'vbscript\s*:',
+    r'data\s*:',
+    r'on\w+\s*=',  # onclick, onerror, onload 等
+    r'expression\s*\(',
+    r'url\s*\(',
+]
+
+# 所有模式合并为一个预编译正则，一次扫描完成检测
+_XSS_RE = re.compile('|'.join(f'(?:{p})' for p in _XSS_PATTERNS))
+
+
 def check_xss_patterns(text: str) -> Tuple[bool, str]:
     """
     检测文本中是否包含 XSS 攻击模式
@@ -73,38 +131,35 @@ def check_xss_patterns(text: str) -> Tuple[bool, str]:
     if not text:
         return True, ""
     
-    text_lower = text.lower()
-    
-    # 危险的 HTML 标签和属性
-    dangerous_patterns = [
-        r'<\s*script',
-        r'<\s*iframe',
-        r'<\s*object',
-        r'<\s*embed',
-        r'<\s*form',
-        r'<\s*input',
-        r'<\s*link',
-        r'<\s*meta',
-        r'<\s*style',
-        r'<\s*svg',
-        r'<\s*math',
-        r'javascript\s*:',
-        r'vbscript\s*:',
-        r'data\s*:',
-        r'on\w+\s*=',  # onclick, onerror, onload 等
-        r'expression\s*\(',
-        r'url\s*\(',
-    ]
-    
-    for pattern in dangerous_patterns:
-        if re.search(pattern, text_lower):
-            return False, "内容包含不允许的代码"
+    return _check_xss_lower(text.lower())
+
+
+def _check_xss_lower(text_lower: str) -> Tuple[bool, str]:
+    """XSS 检测（参数为已转小写的文本）"""
+    if _XSS_RE.search(text_lower):
+        return False, "内容包含不允许的代码"
     
     return True, ""
 
 
 # ============ SQL 注入防护 ============
 
+# 可疑的 SQL 注入模式
+_SQL_INJECTION_PATTERNS = [
+    r"('\s*or\s+'.*'\s*=\s*')",  # ' OR '1'='1
+    r'(;\s*drop\s+table)',
+    r'(;\s*delete\s+from)',
+    r'(;\s*insert\s+into)',
+    r'(;\s*update\s+.*\s+set)',
+    r'(union\s+select)',
+    r'(union\s+all\s+select)',
+    r'(--\s*$)',  # SQL 注释
+    r'(/\*.*\*/)',  # SQL 块注释
+]
+
+_SQL_RE = re.compile('|'.join(f'(?:{p})' for p in _SQL_INJECTION_PATTERNS))
+
+
 def check_sql_injection(text: str) -> Tuple[bool, str]:
     """
     检测文本中是否包含 SQL 注入攻击模式
@@ -120,24 +175,13 @@ def check_sql_injection(text: str) -> Tuple[bool, str]:
     if not text:
         return True, ""
     
-    text_lower = text.lower()
-    
-    # 可疑的 SQL 注入模式
-    suspicious_patterns = [
-        r"('\s*or\s+'.*'\s*=\s*')",  # ' OR '1'='1
-        r'(;\s*drop\s+table)',
-        r'(;\s*delete\s+from)',
-        r'(;\s*insert\s+into)',
-        r'(;\s*update\s+.*\s+set)',
-        r'(union\s+select)',
-        r'(union\s+all\s+select)',
-        r'(--\s*$)',  # SQL 注释
-        r'(/\*.*\*/)',  # SQL 块注释
-    ]
-    
-    for pattern in suspicious_patterns:
-        if re.search(pattern, text_lower):
-            return False, "内容包含不允许的字符序列"
+    return _check_sql_lower(text.lower())
+
+
+def _check_sql_lower(text_lower: str) -> Tuple[bool, str]:
+    """SQL 注入检测（参数为已转小写的文本）"""
+    if _SQL_RE.search(text_lower):
+        return False, "内容包含不允许的字符序列"
     
     return True, ""
 
@@ -157,12 +201,19 @@ def check_spam_content(text: str) -> Tuple[bool, str]:
     if not text:
         return True, ""
     
-    text_lower = text.lower()
-    keywords = _load_spam_keywords()
+    return _check_spam_lower(text.lower())
+
+
+def _check_spam_lower(text_lower: str) -> Tuple[bool, str]:
+    """垃圾关键词检测（参数为已转小写的文本）"""
+    if not _load_spam_keywords():
+        return True, ""
     
-    for keyword in keywords:
-        if keyword in text_lower:
+    if _spam_automaton is not None:
+        for _ in _spam_automaton.iter(text_lower):
             return False, "内容包含不允许的词汇"
+    elif _spam_re is not None and _spam_re.search(text_lower):
+        return False, "内容包含不允许的词汇"
     
     return True, ""
 
@@ -248,6 +299,14 @@ def auto_review_content(
     return True, "自动通过"
 
 
+# 简单的邮箱格式验证正则
+# 符合大部分邮箱格式，遵循 RFC 5322 简化版
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# URL 格式验证正则
+_URL_RE = re.compile(r'^https?://[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*(/.*)?$')
+
+
 def validate_email(email: Optional[str]) -> Tuple[bool, str]:
     """
     验证邮箱格式
@@ -263,11 +322,7 @@ def validate_email(email: Optional[str]) -> Tuple[bool, str]:
     
     email = email.strip()
     
-    # 简单的邮箱格式验证正则
-    # 符合大部分邮箱格式，遵循 RFC 5322 简化版
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    
-    if not re.match(pattern, email):
+    if not _EMAIL_RE.match(email):
         return False, "邮箱格式不正确"
     
     if len(email) > 254:  # RFC 5321 规定邮箱最大长度
@@ -295,10 +350,7 @@ def validate_url(url: Optional[str]) -> Tuple[bool, str]:
     if not url.startswith(('http://', 'https://')):
         return False, "URL 必须以 http:// 或 https:// 开头"
     
-    # URL 格式验证正则
-    pattern = r'^https?://[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*(/.*)?$'
-    
-    if not re.match(pattern, url):
+    if not _URL_RE.match(url):
         return False, "URL 格式不正确"
     
     if len(url) > 2048:  # 大部分浏览器支持的最大 URL 长度
@@ -335,6 +387,10 @@ def validate_qq(qq: Optional[str]) -> Tuple[bool, str]:
     return True, ""
 
 
+# 昵称中禁止的特殊字符
+_FORBIDDEN_NICK_RE = re.compile(r'[<>&"\'\\/\n\r\t]')
+
+
 def validate_nickname(nickname: Optional[str]) -> Tuple[bool, str]:
     """
     验证昵称格式
@@ -361,10 +417,9 @@ def validate_nickname(nickname: Optional[str]) -> Tuple[bool, str]:
         return False, "昵称不能为空"
     
     # 禁止某些特殊字符（可根据需要调整）
-    forbidden_chars = ['<', '>', '&', '"', "'", '\\', '/', '\n', '\r', '\t']
-    for char in forbidden_chars:
-        if char in nickname:
-            return False, f"昵称不能包含特殊字符: {char}"
+    match = _FORBIDDEN_NICK_RE.search(nickname)
+    if match:
+        return False, f"昵称不能包含特殊字符: {match.group()}"
     
     # 检测垃圾昵称模式
     is_spam, msg = check_spam_nickname(nickname)
@@ -396,6 +451,8 @@ SPAM_NICKNAME_PATTERNS = [
     r'普法.*\d*',
 ]
 
+_SPAM_NICK_RE = re.compile('|'.join(f'(?:{p})' for p in SPAM_NICKNAME_PATTERNS))
+
 
 def check_spam_nickname(nickname: str) -> Tuple[bool, str]:
     """
@@ -410,13 +467,32 @@ def check_spam_nickname(nickname: str) -> Tuple[bool, str]:
     if not nickname:
         return False, ""
     
-    for pattern in SPAM_NICKNAME_PATTERNS:
-        if re.search(pattern, nickname):
-            return True, "昵称不可用"
+    if _SPAM_NICK_RE.search(nickname):
+        return True, "昵称不可用"
     
     return False, ""
 
 
+# 简单检查：emoji 的 Unicode 范围
+# 这是一个简化的检查，涵盖大部分常用 emoji
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # 表情符号
+    "\U0001F300-\U0001F5FF"  # 符号和象形文字
+    "\U0001F680-\U0001F6FF"  # 交通和地图符号
+    "\U0001F700-\U0001F77F"  # 炼金术符号
+    "\U0001F780-\U0001F7FF"  # 几何形状扩展
+    "\U0001F800-\U0001F8FF"  # 补充箭头-C
+    "\U0001F900-\U0001F9FF"  # 补充符号和象形文字
+    "\U0001FA00-\U0001FA6F"  # 国际象棋符号
+    "\U0001FA70-\U0001FAFF"  # 符号和象形文字扩展-A
+    "\U00002702-\U000027B0"  # 装饰符号
+    "\U000024C2-\U0001F251"  # 封闭字母数字补充
+    "]+",
+    flags=re.UNICODE
+)
+
+
 def validate_emoji(emoji: Optional[str]) -> Tuple[bool, str]:
     """
     验证是否为有效的单个 emoji
@@ -434,26 +510,7 @@ def validate_emoji(emoji: Optional[str]) -> Tuple[bool, str]:
     if len(emoji) == 0:
         return True, ""  # 空字符串将使用默认值
     
-    # 简单检查：emoji 的 Unicode 范围
-    # 这是一个简化的检查，涵盖大部分常用 emoji
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # 表情符号
-        "\U0001F300-\U0001F5FF"  # 符号和象形文字
-        "\U0001F680-\U0001F6FF"  # 交通和地图符号
-        "\U0001F700-\U0001F77F"  # 炼金术符号
-        "\U0001F780-\U0001F7FF"  # 几何形状扩展
-        "\U0001F800-\U0001F8FF"  # 补充箭头-C
-        "\U0001F900-\U0001F9FF"  # 补充符号和象形文字
-        "\U0001FA00-\U0001FA6F"  # 国际象棋符号
-        "\U0001FA70-\U0001FAFF"  # 符号和象形文字扩展-A
-        "\U00002702-\U000027B0"  # 装饰符号
-        "\U000024C2-\U0001F251"  # 封闭字母数字补充
-        "]+",
-        flags=re.UNICODE
-    )
-    
-    if not emoji_pattern.fullmatch(emoji):
+    if not _EMOJI_RE.fullmatch(emoji):
         return False, "头像必须是一个有效的 emoji 表情"
     
     # 检查长度，确保是单个 emoji（某些 emoji 可能由多个 Unicode 字符组成）
@@ -464,6 +521,22 @@ def validate_emoji(emoji: Optional[str]) -> Tuple[bool, str]:
     return True, ""
 
 
+def _check_content_length(content: str) -> Tuple[bool, str]:
+    """检查内容是否为空及长度限制"""
+    if not content or content.strip() == "":
+        return False, "内容不能为空"
+    
+    content = content.strip()
+    
+    if len(content) < 1:
+        return False, "内容不能为空"
+    
+    if len(content) > 10000:  # 限制最大长度
+        return False, "内容长度不能超过 10000 个字符"
+    
+    return True, ""
+
+
 def validate_content(content: str) -> Tuple[bool, str]:
     """
     验证内容格式
@@ -474,29 +547,25 @@ def validate_content(content: str) -> Tuple[bool, str]:
     Returns:
         (是否有效, 错误信息)
     """
-    if not content or content.strip() == "":
-        return False, "内容不能为空"
-    
-    content = content.strip()
+    is_valid, error = _check_content_length(content)
+    if not is_valid:
+        return False, error
     
-    if len(content) < 1:
-        return False, "内容不能为空"
-    
-    if len(content) > 10000:  # 限制最大长度
-        return False, "内容长度不能超过 10000 个字符"
+    # 只转一次小写，三项检测共用
+    content_lower = content.strip().lower()
     
     # 检查 XSS 攻击模式
-    is_safe, error = check_xss_patterns(content)
+    is_safe, error = _check_xss_lower(content_lower)
     if not is_safe:
         return False, error
     
     # 检查 SQL 注入模式
-    is_safe, error = check_sql_injection(content)
+    is_safe, error = _check_sql_lower(content_lower)
     if not is_safe:
         return False, error
     
     # 检查垃圾内容
-    is_clean, error = check_spam_content(content)
+    is_clean, error = _check_spam_lower(content_lower)
     if not is_clean:
         return False, error
     
@@ -508,10 +577,14 @@ def validate_all_fields(
     nickname: Optional[str] = None,
     email: Optional[str] = None,
     qq: Optional[str] = None,
-    url: Optional[str] = None
+    url: Optional[str] = None,
+    avatar: Optional[str] = None
 ) -> Tuple[bool, str]:
     """
-    综合验证所有字段的安全性
+    综合验证所有字段的安全性与格式
+    
+    先对所有字段做 XSS / SQL 注入 / 垃圾词检测，再逐个检查各字段格式，
+    每项检查只执行一次，遇到第一个失败即返回。
     
     Args:
         content: 内容
@@ -519,32 +592,52 @@ def validate_all_fields(
         email: 邮箱
         qq: QQ号
         url: 链接
+        avatar: 头像 emoji
     
     Returns:
         (是否通过, 错误信息)
     """
-    # 检查所有字段的 XSS
-    for field_name, field_value in [
-        ("内容", content),
-        ("昵称", nickname),
-        ("邮箱", email),
-        ("QQ", qq),
-        ("链接", url)
+    # 检查所有字段的 XSS / SQL 注入，垃圾词仅检查 content 和 nickname
+    # 每个字段只转一次小写，三项检测共用
+    spam_fields = []
+    for field_name, field_value, check_spam in [
+        ("内容", content, True),
+        ("昵称", nickname, True),
+        ("邮箱", email, False),
+        ("QQ", qq, False),
+        ("链接", url, False)
     ]:
         if field_value:
-            is_safe, _ = check_xss_patterns(field_value)
+            field_lower = field_value.lower()
+            
+            is_safe, _ = _check_xss_lower(field_lower)
             if not is_safe:
                 return False, f"{field_name}包含不允许的内容"
             
-            is_safe, _ = check_sql_injection(field_value)
+            is_safe, _ = _check_sql_lower(field_lower)
             if not is_safe:
                 return False, f"{field_name}包含不允许的内容"
+            
+            if check_spam:
+                spam_fields.append((field_name, field_lower))
     
     # 检查垃圾内容（仅对 content 和 nickname）
-    for field_name, field_value in [("内容", content), ("昵称", nickname)]:
-        if field_value:
-            is_clean, _ = check_spam_content(field_value)
-            if not is_clean:
-                return False, f"{field_name}包含不允许的词汇"
+    for field_name, field_lower in spam_fields:
+        is_clean, _ = _check_spam_lower(field_lower)
+        if not is_clean:
+            return False, f"{field_name}包含不允许的词汇"
+    
+    # 逐个检查字段格式（内容的安全检测已在上面完成，这里只检查长度）
+    for validator, field_value in [
+        (_check_content_length, content),
+        (validate_nickname, nickname),
+        (validate_email, email),
+        (validate_qq, qq),
+        (validate_url, url),
+        (validate_emoji, avatar)
+    ]:
+        is_valid, error = validator(field_value)
+        if not is_valid:
+            return False, error
     
     return True, ""